@@ -0,0 +1,46 @@
+"""
+Single exciton transport on a molecular ring coupled to a cavity.
+
+Submodules and the names below are imported on first access, so a worker that only runs
+trajectories loads numpy and the propagator, never scipy or matplotlib:
+
+    from exciton import SimulationConfig, Simulation
+    import exciton.spectrum
+"""
+import importlib
+
+SUBMODULES = ('cache', 'correlation', 'eigenbasis', 'ensemble', 'lowrank', 'output', 'pipeline',
+              'plotting', 'runner', 'sparsemodel', 'spectrum', 'trajectory', 'window')
+
+EXPORTS = {
+    'SingleExcitationWithCollectiveCoupling':   'trajectory',
+    'StateLayout':                              'trajectory',
+    'InitialStates':                            'trajectory',
+    'SimulationConfig':                         'runner',
+    'Simulation':                               'runner',
+    'ObservableRecorder':                       'runner',
+    'PrintRecorder':                            'runner',
+    'runSimulation':                            'runner',
+    'writeManifest':                            'runner',
+    'CurrentCorrelation':                       'correlation',
+    'runEnsemble':                              'ensemble',
+    'runSharedEnsemble':                        'ensemble',
+    'DiskCache':                                'cache',
+    'RingRankOneSolver':                        'lowrank',
+}
+
+__all__ = list(SUBMODULES) + list(EXPORTS)
+
+
+def __getattr__(name):
+    if name in SUBMODULES:
+        return importlib.import_module('.'+name, __name__)
+    if name in EXPORTS:
+        value = getattr(importlib.import_module('.'+EXPORTS[name], __name__), name)
+        globals()[name] = value
+        return value
+    raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
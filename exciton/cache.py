@@ -0,0 +1,219 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+from dataclasses import asdict
+
+import numpy as np
+
+from .trajectory import StateLayout
+
+
+# config fields that determine the operators after the disorder setup in runner.buildHamiltonian
+# (dt only enters the later dynamic-disorder steps and the propagator entries, keyed by tau)
+MODEL_FIELDS = ('Nmol','Wgrd','Wcav','Wmol','Vndd','Vcav','Kcav','Gamma',
+                'useStaticNeighborDisorder','useDynamicNeighborDisorder','DeltaNN','TauNN',
+                'useStaticDiagonalDisorder','useDynamicDiagonalDisorder','DeltaDD','TauDD',
+                'seed','backend')
+
+MODEL_ARRAYS = ('Ht0','Ht','Jt0','Jt','Qmat','Wstc','Vstc','Wdyn','Xdyn')
+
+
+class DiskCache():
+    """
+    Content-addressed cache of numpy arrays on disk.
+
+    Every entry is a directory named by the sha256 of (kind, params) holding one .npy file
+    per array and a meta.json; arrays are memory-mapped on load. When the total size
+    exceeds maxBytes the least recently used entries are evicted.
+    """
+    def __init__(self, root, maxBytes=4*2**30):
+        self.root = os.path.expanduser(root)
+        self.maxBytes = maxBytes
+        os.makedirs(self.root, exist_ok=True)
+
+    def key(self, kind, params):
+        text = json.dumps({'kind': kind, 'params': params}, sort_keys=True, default=repr)
+        return hashlib.sha256(text.encode()).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.root, key)
+
+    def get(self, kind, params):
+        """
+        Return (arrays, meta) or None; arrays are read-only memory maps
+        """
+        path = self._path(self.key(kind, params))
+        metafile = os.path.join(path, 'meta.json')
+        if not os.path.exists(metafile):
+            return None
+        with open(metafile) as f:
+            meta = json.load(f)
+        arrays = {name: np.load(os.path.join(path, name+'.npy'), mmap_mode='r') for name in meta['arrays']}
+        os.utime(metafile)      # mark as recently used
+        return arrays, meta.get('extra', {})
+
+    def put(self, kind, params, arrays, extra=None):
+        """
+        Store the arrays atomically (written to a temporary directory, then renamed).
+        Older entries are evicted to make room, never the one just stored
+        """
+        path = self._path(self.key(kind, params))
+        if os.path.exists(path):
+            return
+        tmp = tempfile.mkdtemp(dir=self.root, prefix='.tmp-')
+        for name, value in arrays.items():
+            np.save(os.path.join(tmp, name+'.npy'), np.ascontiguousarray(value))
+        with open(os.path.join(tmp, 'meta.json'), 'w') as f:
+            json.dump({'kind': kind, 'params': params, 'arrays': list(arrays),
+                       'extra': extra or {}, 'created': time.time()}, f, default=repr)
+        try:
+            os.rename(tmp, path)
+        except OSError:         # another process stored the same entry first
+            shutil.rmtree(tmp, ignore_errors=True)
+        self.evict(keep=path)
+
+    def getOrCompute(self, kind, params, compute):
+        """
+        compute() returns a dict of arrays; it runs only on a cache miss. The stored entry is
+        returned memory-mapped, or the computed arrays if it is already gone (evicted by
+        another process)
+        """
+        entry = self.get(kind, params)
+        if entry is not None:
+            return entry[0]
+        arrays = compute()
+        self.put(kind, params, arrays)
+        entry = self.get(kind, params)
+        return entry[0] if entry is not None else arrays
+
+    def entries(self):
+        """
+        (last use, size in bytes, path) of every entry
+        """
+        result = []
+        for name in os.listdir(self.root):
+            path = self._path(name)
+            metafile = os.path.join(path, 'meta.json')
+            if name.startswith('.') or not os.path.exists(metafile):
+                continue
+            size = sum(os.path.getsize(os.path.join(path, f)) for f in os.listdir(path))
+            result.append((os.path.getmtime(metafile), size, path))
+        return result
+
+    def evict(self, keep=None):
+        """
+        Remove the least recently used entries until the total fits maxBytes, except keep
+        """
+        entries = sorted(self.entries())
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.maxBytes:
+                break
+            if path == keep:
+                continue
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
+
+    def clear(self):
+        for _, _, path in self.entries():
+            shutil.rmtree(path, ignore_errors=True)
+
+
+def disordered(config):
+    return (config.useStaticNeighborDisorder or config.useDynamicNeighborDisorder or
+            config.useStaticDiagonalDisorder or config.useDynamicDiagonalDisorder)
+
+
+def modelParams(config):
+    """
+    The seed only determines the operators of a disordered model
+    """
+    params = {name: value for name, value in asdict(config).items() if name in MODEL_FIELDS}
+    if not disordered(config):
+        del params['seed']
+    return params
+
+
+def cacheable(config):
+    """
+    Random disorder without a seed cannot be reproduced, and only the dense backend is stored
+    """
+    if config.backend != 'dense':
+        return False
+    return not (disordered(config) and config.seed is None)
+
+
+def saveModel(cache, config, model):
+    arrays = {name: getattr(model, name) for name in MODEL_ARRAYS if hasattr(model, name)}
+    state = np.random.get_state()
+    arrays['rngKeys'] = state[1]
+    extra = {'Wmol': model.Wmol, 'Gamma': model.Gamma, 'useQmatrix': model.useQmatrix,
+             'rng': [state[0], int(state[2]), int(state[3]), float(state[4])]}
+    cache.put('model', modelParams(config), arrays, extra)
+
+
+def loadModel(cache, config, cls):
+    """
+    Rebuild a model after the disorder setup from the cache, restoring (or seeding) the random
+    state so the following draws (dynamic disorder, random initial states) are unchanged
+    """
+    entry = cache.get('model', modelParams(config))
+    if entry is None:
+        return None
+    arrays, extra = entry
+    model = cls(config.Nmol,0,seed=config.seed)
+    for name in MODEL_ARRAYS:
+        if name in arrays:
+            value = arrays[name]
+            # Ht and Jt are updated in place by the disorder/correlation methods
+            setattr(model, name, np.array(value) if name in ('Ht','Jt','Wdyn','Xdyn') else value)
+    model.Wmol = extra['Wmol']
+    model.Gamma = extra['Gamma']
+    model.useQmatrix = extra['useQmatrix']
+    model.Icav = 1
+    model.Imol = 2
+    model.layout = StateLayout(model.Nmol,0,hasCavity=True)
+    if disordered(config):
+        # a clean model draws nothing after seeding, and its entry is shared by all seeds
+        name, pos, hasGauss, cachedGaussian = extra['rng']
+        np.random.set_state((name, np.array(arrays['rngKeys']), pos, hasGauss, cachedGaussian))
+    return model
+
+
+def eigenParams(config):
+    params = modelParams(config)
+    params['kind'] = 'eigen'
+    return params
+
+
+def cachedCurrentCorrelation(cache, config, model):
+    """
+    CurrentCorrelation with its eigendecomposition taken from / stored in the cache
+    """
+    from .correlation import CurrentCorrelation
+
+    def compute():
+        engine = CurrentCorrelation.fromModel(model)
+        arrays = {'E': engine.E, 'V': engine.V, 'Vinv': engine.Vinv, 'K': engine.K}
+        if engine.G is not engine.K:    # G = K for Hermitian Ht, stored once
+            arrays['G'] = engine.G
+        return arrays
+
+    arrays = cache.getOrCompute('eigen', eigenParams(config), compute)
+    return CurrentCorrelation.fromArrays(**arrays)
+
+
+def cachedPropagator(cache, config, model, tau):
+    """
+    Exact propagator U(tau) = V exp(-i E tau) V^-1 of the static Ht
+    """
+    def compute():
+        engine = cachedCurrentCorrelation(cache, config, model)
+        return {'U': engine.propagator(tau)}
+
+    params = eigenParams(config)
+    params['tau'] = tau
+    return cache.getOrCompute('propagator', params, compute)['U']
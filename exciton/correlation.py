@@ -0,0 +1,135 @@
+import numpy as np
+
+_trapezoid = getattr(np, 'trapezoid', None) or np.trapz
+
+
+def currentOperator(Ht, Imol, Nmol):
+    """
+    Current operator of the ring built from the nearest-neighbor couplings of Ht,
+    the same construction as SingleExcitationWithCollectiveCoupling.getCurrentCorrelation.
+    Pass Ht without the Qmat damping, otherwise -i*Gamma/2 leaks into the couplings
+    """
+    Jt = np.zeros_like(Ht, dtype=complex)
+    j = np.arange(Imol, Imol+Nmol-1)
+    Jt[j,   j+1] = Ht[j,   j+1]*1j
+    Jt[j+1, j  ] =-Ht[j+1, j  ]*1j
+    Jt[Imol,Imol+Nmol-1] =-Ht[Imol,Imol+Nmol-1]*1j
+    Jt[Imol+Nmol-1,Imol] = Ht[Imol+Nmol-1,Imol]*1j
+    return Jt
+
+
+def modelCurrentOperator(model):
+    Hcoup = model.Ht - model.Qmat if hasattr(model, 'Qmat') else model.Ht
+    return currentOperator(Hcoup, model.Imol, model.Nmol)
+
+
+class CurrentCorrelation():
+    """
+    Current autocorrelation CJJ(s,t) = <psi(s+t)| J U(t) J |psi(s)> of a static Hamiltonian,
+    evaluated in its eigenbasis instead of propagating Cj and J0Cj side by side.
+
+    With H = V diag(E) V^-1, c = V^-1 psi(0), G = V^+ J V and K = V^-1 J V:
+        CJJ(s,t) = sum_mn conj(c_m e^{-iE_m(s+t)}) G_mn e^{-iE_n t} (K e^{-iEs} c)_n
+    For Hermitian H (Gamma=0) V is unitary and G = K. One diagonalization serves every
+    time origin s and lag t.
+    """
+    def __init__(self, Ht, Jt, hermitian=None):
+        if hermitian is None:
+            hermitian = np.allclose(Ht, np.conj(Ht).T)
+        self.hermitian = hermitian
+        if hermitian:
+            self.E, self.V = np.linalg.eigh(Ht)
+            self.Vinv = np.conj(self.V).T
+        else:
+            self.E, self.V = np.linalg.eig(Ht)
+            self.Vinv = np.linalg.inv(self.V)
+        self.K = self.Vinv @ Jt @ self.V
+        self.G = self.K if hermitian else np.conj(self.V).T @ Jt @ self.V
+
+    @classmethod
+    def fromArrays(cls, E, V, Vinv, K, G=None):
+        """
+        Rebuild from a stored decomposition (e.g. from cache.DiskCache); G is omitted
+        for a Hermitian Ht, where it equals K
+        """
+        engine = cls.__new__(cls)
+        engine.hermitian = G is None or G is K or np.array_equal(G, K)
+        engine.E, engine.V, engine.Vinv, engine.K = E, V, Vinv, K
+        engine.G = K if G is None else G
+        return engine
+
+    @classmethod
+    def fromModel(cls, model):
+        """
+        Use the current (disordered) Ht of a SingleExcitationWithCollectiveCoupling;
+        the sparse backend provides dense copies through denseOperators()
+        """
+        if hasattr(model, 'denseOperators'):
+            return cls(*model.denseOperators())
+        return cls(model.Ht, modelCurrentOperator(model))
+
+    def propagator(self, tau):
+        """
+        Exact propagator U(tau) = V exp(-i E tau) V^-1
+        """
+        return (self.V*np.exp(-1j*self.E*tau)[None,:]) @ self.Vinv
+
+    def coefficients(self, Cj0):
+        """
+        c = V^-1 psi(0), the eigenbasis coefficients of the initial state
+        """
+        return np.dot(self.Vinv, np.ravel(Cj0))
+
+    def correlation(self, Cj0, lags, origins=(0.0,), c=None):
+        """
+        Return CJJ with shape (len(origins), len(lags)) for the initial state Cj0
+        (or its precomputed coefficients c)
+        """
+        if c is None:
+            c = self.coefficients(Cj0)
+        lags = np.asarray(lags, dtype=float)
+        origins = np.asarray(origins, dtype=float)
+
+        Cs = c[None,:]*np.exp(-1j*np.outer(origins, self.E))         # (Norigin, dim)
+        A = np.conj(Cs)
+        B = Cs @ self.K.T
+        CJJ = np.zeros((len(origins),len(lags)), complex)
+        for it, t in enumerate(lags):
+            phase = np.exp(-1j*self.E*t)
+            CJJ[:,it] = np.sum(((A*np.conj(phase)) @ self.G) * (B*phase), axis=1)
+        return CJJ
+
+    def current(self, Cj0, times, c=None):
+        """
+        Average current <psi(t)|J|psi(t)> = d^+ G d with d = e^{-iEt} c
+        """
+        if c is None:
+            c = self.coefficients(Cj0)
+        D = c[None,:]*np.exp(-1j*np.outer(np.asarray(times, dtype=float), self.E))
+        return np.sum(np.conj(D)*(D @ self.G.T), axis=1)
+
+    def averageCorrelation(self, Cj0, lags, origins=(0.0,)):
+        """
+        CJJ(t) averaged over the time origins
+        """
+        return np.mean(self.correlation(Cj0, lags, origins), axis=0)
+
+    def traceCorrelation(self, lags):
+        """
+        Infinite-temperature correlation Tr[J(t)J]/dim, independent of the initial state.
+        Only defined for Hermitian H
+        """
+        if not self.hermitian:
+            raise ValueError("traceCorrelation requires a Hermitian Hamiltonian")
+        weight = np.abs(self.K)**2
+        Ediff = self.E[:,None] - self.E[None,:]
+        lags = np.asarray(lags, dtype=float)
+        return np.array([np.sum(weight*np.exp(1j*Ediff*t)) for t in lags])/len(self.E)
+
+    def diffusionCoefficient(self, Cj0, lags, origins=(0.0,)):
+        """
+        Green-Kubo diffusion constant D = int_0^T Re CJJ(t) dt (in site units)
+        """
+        lags = np.asarray(lags, dtype=float)
+        CJJ = self.averageCorrelation(Cj0, lags, origins)
+        return _trapezoid(np.real(CJJ), lags)
@@ -0,0 +1,136 @@
+import copy
+
+import numpy as np
+
+from .trajectory import SingleExcitationWithCollectiveCoupling
+
+
+class _LazySiteVector():
+    """
+    Site-basis vector kept as eigenbasis coefficients and back-transformed only when read
+    """
+    def __init__(self, name):
+        self.name = name
+
+    def __get__(self, model, owner=None):
+        if model is None:
+            return self
+        store = model.__dict__
+        site = store.get('_site_'+self.name)
+        if site is None and store.get('_coef_'+self.name) is not None:
+            site = model.toSite(store['_coef_'+self.name])
+            store['_site_'+self.name] = site
+        if site is None:
+            raise AttributeError(self.name)
+        return site
+
+    def __set__(self, model, value):
+        model.__dict__['_site_'+self.name] = value
+        model.__dict__['_coef_'+self.name] = None
+
+    def __delete__(self, model):
+        model.__dict__.pop('_site_'+self.name, None)
+        model.__dict__.pop('_coef_'+self.name, None)
+
+
+class EigenbasisSingleExcitationWithCollectiveCoupling(SingleExcitationWithCollectiveCoupling):
+    """
+    Dense model propagated in the eigenbasis of its static Hamiltonian.
+
+    The cavity+molecule block of Ht (the polariton and dark states; the ground state is
+    decoupled) is diagonalized once, after the static disorder, on the first propagation
+    step. A step then multiplies the eigenbasis coefficients by the phases exp(-i*E*dt),
+    O(N) instead of the O(N^2) matvecs of RK4. Cj and J0Cj are back-transformed to the
+    site basis only when they are read, i.e. at the recorded steps, so the site-basis
+    observables (getDisplacement, getIPR, getPopulation_cavity, ...) are unchanged.
+    With Gamma != 0 the block is non-Hermitian and the right eigenvectors are used.
+
+    The runner uses it with propagator='eigenbasis' and correlationMethod='spectral' only:
+    RK4 would advance Cj in the site basis, and the 'propagate' method reads Cj (and so
+    back-transforms) on every step. Dynamic disorder changes Ht every step and is rejected.
+    """
+
+    Cj = _LazySiteVector('Cj')
+    J0Cj = _LazySiteVector('J0Cj')
+
+    def _noDynamicDisorder(self,*args,**kwargs):
+        raise ValueError("eigenbasis propagation needs a static Hamiltonian")
+
+    updateDiagonalDynamicDisorder = _noDynamicDisorder
+    updateNeighborDynamicDisorder = _noDynamicDisorder
+
+    def snapshot(self):
+        """
+        Copy for pipeline.ObservablePipeline: Cj and J0Cj are read through the public
+        attributes and copied, whichever basis they are currently held in
+        """
+        snap = copy.copy(self)
+        for name in ('Cj', 'J0Cj'):
+            if self.__dict__.get('_site_'+name) is not None or self.__dict__.get('_coef_'+name) is not None:
+                setattr(snap, name, getattr(self, name).copy())
+        return snap
+
+    def diagonalize(self):
+        """
+        Eigenbasis of the cavity+molecule block of the current Ht
+        """
+        H = self.Ht[1:,1:]
+        self.Egrd = self.Ht[0,0]
+        if np.allclose(H, np.conj(H.T)):
+            self.E, self.U = np.linalg.eigh(H)
+            self.Uinv = np.conj(self.U.T)
+        else:
+            self.E, self.U = np.linalg.eig(H)
+            self.Uinv = np.linalg.inv(self.U)
+        self._phases = {}
+
+    def toEigen(self, C):
+        """
+        Site-basis vector -> (ground amplitude, eigenbasis coefficients)
+        """
+        return C[0].copy(), self.Uinv.dot(C[1:])
+
+    def toSite(self, coef):
+        grd, d = coef
+        C = np.empty((len(d)+1,)+d.shape[1:], complex)
+        C[0] = grd
+        C[1:] = self.U.dot(d)
+        return C
+
+    def _phase(self, dt):
+        if dt not in self._phases:
+            self._phases[dt] = (np.exp(-1j*self.Egrd*dt), np.exp(-1j*self.E*dt)[:,None])
+        return self._phases[dt]
+
+    def _advance(self, name, dt):
+        if not hasattr(self, 'U'):
+            self.diagonalize()
+        store = self.__dict__
+        coef = store.get('_coef_'+name)
+        if coef is None:
+            coef = self.toEigen(store['_site_'+name])
+        pgrd, p = self._phase(dt)
+        store['_coef_'+name] = (coef[0]*pgrd, coef[1]*p)
+        store['_site_'+name] = None
+
+    def propagateCj_Eigenbasis(self,dt):
+        self._advance('Cj',dt)
+
+    def propagateJ0Cj_RK4(self,dt):
+        # J0Cj follows the same static Hamiltonian, so it is advanced exactly as well
+        self._advance('J0Cj',dt)
+
+    def getPopulation_polariton(self):
+        """
+        Populations of the upper polariton, the lower polariton and the dark manifold, taking
+        the two eigenstates with the largest cavity weight as the polaritons
+        """
+        if not hasattr(self, 'U'):
+            self.diagonalize()
+        coef = self.__dict__.get('_coef_Cj')
+        d = coef[1] if coef is not None else self.toEigen(self.Cj)[1]
+        # populations as |coefficient|^2 weighted by the norm of each (right) eigenvector
+        P = np.abs(d[:,0])**2*np.sum(np.abs(self.U)**2,axis=0)
+        bright = np.argsort(np.abs(self.U[self.Icav-1])**2)[-2:]
+        lower, upper = bright[np.argsort(np.real(self.E[bright]))]
+        return P[upper], P[lower], np.sum(P) - P[upper] - P[lower]
@@ -0,0 +1,352 @@
+import os
+import sys
+from dataclasses import replace
+
+import numpy as np
+
+from .runner import Simulation, ObservableRecorder, Recorder, StrideSchedule
+
+
+OBSERVABLES = {
+    'Pmol':         'Pmol',
+    'IPR':          'IPR',
+    'Displacement': 'Displacement_list',
+    'Correlation':  'Correlation_list',
+}
+
+
+class WelfordAccumulator():
+    """
+    Running mean and variance (Welford) of a time series, one entry per recorded time.
+    Complex series are supported; the variance is that of |x-mean|
+    """
+    def __init__(self):
+        self.count = 0
+        self.mean = None
+        self.M2 = None
+
+    def add(self, x):
+        x = np.asarray(x)
+        if self.mean is None:
+            self.mean = np.zeros_like(x, dtype=np.result_type(x, float))
+            self.M2 = np.zeros(x.shape)
+        self.count += 1
+        delta = x - self.mean
+        self.mean += delta/self.count
+        self.M2 += np.real(delta*np.conj(x - self.mean))
+
+    def addBatch(self, X):
+        """
+        Add the rows of X (one realization per row) at once
+        """
+        X = np.asarray(X)
+        if len(X) == 0:
+            return
+        other = WelfordAccumulator()
+        other.count = len(X)
+        other.mean = X.mean(axis=0)
+        other.M2 = np.sum(np.abs(X - other.mean)**2, axis=0)
+        self.merge(other)
+
+    def merge(self, other):
+        """
+        Combine with another accumulator (Chan et al. parallel update)
+        """
+        if other.count == 0:
+            return
+        if self.count == 0:
+            self.count, self.mean, self.M2 = other.count, other.mean.copy(), other.M2.copy()
+            return
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean = self.mean + delta*other.count/count
+        self.M2 = self.M2 + other.M2 + np.abs(delta)**2*self.count*other.count/count
+        self.count = count
+
+    def variance(self):
+        if self.count < 2:
+            return np.full_like(self.M2, np.inf)
+        return self.M2/(self.count-1)
+
+    def standardError(self):
+        return np.sqrt(self.variance()/max(self.count,1))
+
+
+class EnsembleStatistics():
+    """
+    Welford statistics of the recorded observables over disorder realizations
+    """
+    def __init__(self, observables=tuple(OBSERVABLES)):
+        self.times = None
+        self.stats = {name: WelfordAccumulator() for name in observables}
+
+    @property
+    def count(self):
+        return next(iter(self.stats.values())).count
+
+    def add(self, series):
+        """
+        series: dict with 'times' and one array per observable, e.g. from seriesFromRecorder
+        """
+        if self.times is None:
+            self.times = np.asarray(series['times'])
+        for name, acc in self.stats.items():
+            acc.add(series[name])
+
+    def mean(self, name):
+        return self.stats[name].mean
+
+    def standardError(self, name):
+        return self.stats[name].standardError()
+
+    def converged(self, targets, minTraj=2):
+        """
+        targets: {observable: tolerance}; converged once the largest standard error over
+        the recorded times of every listed observable is below its tolerance
+        """
+        if self.count < max(minTraj,2):
+            return False
+        return all(np.max(self.standardError(name)) < tol for name, tol in targets.items())
+
+    def write(self, suffix=''):
+        for name, acc in self.stats.items():
+            with open(name+'_avg.dat'+suffix, 'w') as f:
+                stderr = acc.standardError()
+                for it in range(len(self.times)):
+                    if np.iscomplexobj(acc.mean):
+                        f.write("{t}\t{re}\t{im}\t{err}\n".format(t=self.times[it],re=np.real(acc.mean[it]),
+                                                                 im=np.imag(acc.mean[it]),err=stderr[it]))
+                    else:
+                        f.write("{t}\t{avg}\t{err}\n".format(t=self.times[it],avg=acc.mean[it],err=stderr[it]))
+
+
+def seriesFromRecorder(recorder):
+    series = {'times': np.array(recorder.times)}
+    for name, attr in OBSERVABLES.items():
+        series[name] = np.array(getattr(recorder, attr))
+    return series
+
+
+def runRealization(config):
+    """
+    Run one disorder realization and return its time series (module-level so it pickles)
+    """
+    recorder = ObservableRecorder(keepDistribution=False)
+    Simulation(config, [recorder]).run()
+    return seriesFromRecorder(recorder)
+
+
+def runEnsemble(config, maxTraj, targets=None, minTraj=4, executor=None, batch=None, baseSeed=0, stats=None):
+    """
+    Average realizations with seeds baseSeed, baseSeed+1, ... until every observable in
+    targets reaches its standard-error tolerance or maxTraj realizations are done.
+
+    With a concurrent.futures executor, up to `batch` realizations (default: the number of
+    CPUs) are in flight and results are folded in as they complete; no new ones are
+    launched after convergence.
+    """
+    stats = stats if stats is not None else EnsembleStatistics()
+    targets = targets or {}
+
+    def done():
+        return bool(targets) and stats.converged(targets, minTraj)
+
+    if executor is None:
+        for itraj in range(maxTraj):
+            stats.add(runRealization(replace(config, seed=baseSeed+itraj)))
+            if done():
+                break
+        return stats
+
+    from concurrent.futures import wait, FIRST_COMPLETED
+    batch = batch or os.cpu_count() or 1
+    pending = set()
+    launched = 0
+    while True:
+        while launched < maxTraj and len(pending) < batch and not done():
+            pending.add(executor.submit(runRealization, replace(config, seed=baseSeed+launched)))
+            launched += 1
+        if not pending:
+            break
+        finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in finished:
+            stats.add(future.result())
+        if done():
+            for future in pending:
+                future.cancel()
+            break
+    return stats
+
+
+def createSharedMemory(size):
+    from multiprocessing import shared_memory
+    return shared_memory.SharedMemory(create=True, size=size)
+
+
+def attachSharedMemory(name):
+    """
+    Attach to an existing block without registering it with this process' resource tracker.
+    A worker started before the parent's tracker runs gets a tracker of its own, which would
+    unlink the block as leaked when the worker exits (and the parent's unlink then fails).
+    Python >= 3.13 has track=False; before that the registration is skipped for the attach
+    """
+    from multiprocessing import resource_tracker, shared_memory
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+    register = resource_tracker.register
+    resource_tracker.register = lambda name, rtype: None
+    try:
+        return shared_memory.SharedMemory(name=name)
+    finally:
+        resource_tracker.register = register
+
+
+# dtype of every observable row in a SharedEnsembleBuffer
+SHARED_FIELDS = (('Pmol', np.float64), ('IPR', np.float64),
+                 ('Displacement', np.float64), ('Correlation', np.complex128))
+
+
+class SharedEnsembleBuffer():
+    """
+    Preallocated (Ntraj, Ntimes) result arrays for every observable in one shared block,
+    either multiprocessing.shared_memory (path=None) or a memmapped file (path given, which
+    may live on a shared filesystem so jobs on several nodes fill the same file).
+
+    Realization i owns row i of every array and sets done[i] after writing it, so workers
+    never need a lock and nothing but the small spec() tuple is pickled.
+    """
+    def __init__(self, Ntraj, times, path=None, create=True, _name=None):
+        self.Ntraj = Ntraj
+        self.times = np.asarray(times, dtype=float)
+        self.path = path
+        Nt = len(self.times)
+        self.offsets = {}
+        size = 0
+        for name, dtype in SHARED_FIELDS:
+            self.offsets[name] = size
+            size += Ntraj*Nt*np.dtype(dtype).itemsize
+        self.offsets['done'] = size
+        size += Ntraj
+        self.size = size
+
+        self.shm = None
+        if path is not None:
+            self.memory = np.memmap(path, dtype=np.uint8, mode='w+' if create else 'r+', shape=(size,))
+        else:
+            # only the creating process owns (and unlinks) the block, see attachSharedMemory
+            self.shm = createSharedMemory(size) if create else attachSharedMemory(_name)
+            self.memory = np.ndarray((size,), dtype=np.uint8, buffer=self.shm.buf)
+        if create:
+            self.memory[self.offsets['done']:] = 0
+
+        self.arrays = {}
+        for name, dtype in SHARED_FIELDS:
+            count = Ntraj*Nt*np.dtype(dtype).itemsize
+            start = self.offsets[name]
+            self.arrays[name] = self.memory[start:start+count].view(dtype).reshape(Ntraj, Nt)
+        self.done = self.memory[self.offsets['done']:]
+
+    def spec(self):
+        """
+        Everything a worker needs to attach (picklable and small)
+        """
+        return (self.Ntraj, self.times, self.path, None if self.shm is None else self.shm.name)
+
+    @classmethod
+    def attach(cls, spec):
+        Ntraj, times, path, name = spec
+        return cls(Ntraj, times, path=path, create=False, _name=name)
+
+    def row(self, itraj):
+        return {name: array[itraj] for name, array in self.arrays.items()}
+
+    def reduce(self, chunk=1024):
+        """
+        EnsembleStatistics of the finished rows, read chunk rows at a time so the memory
+        of the reduction does not grow with Ntraj
+        """
+        stats = EnsembleStatistics()
+        stats.times = self.times
+        for start in range(0, self.Ntraj, chunk):
+            rows = start + np.nonzero(self.done[start:start+chunk])[0]
+            for name, acc in stats.stats.items():
+                acc.addBatch(self.arrays[name][rows])
+        return stats
+
+    def close(self, unlink=False):
+        self.arrays = None
+        self.done = None
+        self.memory = None
+        if self.shm is not None:
+            self.shm.close()
+            if unlink:
+                self.shm.unlink()
+
+
+class RowRecorder(Recorder):
+    """
+    Write the observables of one realization straight into its row of a SharedEnsembleBuffer
+    """
+    def __init__(self, row):
+        self.row = row
+        self.it = 0
+
+    def record(self, t, model, Javg, CJJ):
+        self.row['Pmol'][self.it] = model.getPopulation_system()
+        self.row['IPR'][self.it] = model.getIPR()
+        self.row['Displacement'][self.it] = model.getDisplacement()
+        self.row['Correlation'][self.it] = CJJ
+        self.it += 1
+
+
+def recordedTimes(config):
+    schedule = StrideSchedule(config.Nskip)
+    return np.array([it*config.dt for it in range(config.Ntimes) if schedule.due(it, None)])
+
+
+def runRealizationInto(spec, itraj, config):
+    """
+    Run one realization into row itraj of the buffer described by spec (module-level so it pickles)
+    """
+    buffer = SharedEnsembleBuffer.attach(spec)
+    try:
+        Simulation(config, [RowRecorder(buffer.row(itraj))]).run()
+        if buffer.path is not None:
+            buffer.memory.flush()
+        buffer.done[itraj] = 1
+    finally:
+        buffer.close()
+    return itraj
+
+
+def runSharedEnsemble(config, Ntraj, executor=None, path=None, baseSeed=0, chunk=1024, batch=None):
+    """
+    Run Ntraj realizations with seeds baseSeed, baseSeed+1, ... writing into a
+    SharedEnsembleBuffer and reduce it at the end. Only (spec, index, config) travels to
+    the workers and an index comes back, so neither the transfer nor the parent memory
+    grows with the length of the time series. With path, the memmapped file is kept and
+    can be reduced again later with SharedEnsembleBuffer.attach(...).reduce().
+    With an executor at most `batch` realizations (default: 4 per CPU) are submitted at once
+    """
+    buffer = SharedEnsembleBuffer(Ntraj, recordedTimes(config), path=path)
+    try:
+        spec = buffer.spec()
+        configs = (replace(config, seed=baseSeed+itraj) for itraj in range(Ntraj))
+        if executor is None:
+            for itraj, cfg in enumerate(configs):
+                runRealizationInto(spec, itraj, cfg)
+        else:
+            from concurrent.futures import wait
+            pending = set()
+            batch = batch or 4*(os.cpu_count() or 1)
+            for itraj, cfg in enumerate(configs):
+                pending.add(executor.submit(runRealizationInto, spec, itraj, cfg))
+                if len(pending) >= batch:
+                    finished, pending = wait(pending, return_when='FIRST_COMPLETED')
+                    for future in finished:
+                        future.result()
+            for future in pending:
+                future.result()
+        return buffer.reduce(chunk)
+    finally:
+        buffer.close(unlink=True)
@@ -0,0 +1,246 @@
+import numpy as np
+
+from .trajectory import StateLayout
+from .spectrum import secularRoots
+
+
+class RingRankOneSolver():
+    """
+    Exact spectrum, propagator and resolvent of the clean ring with a cavity and the
+    non-Hermitian damping of initialHamiltonian_Cavity_nonHermitian (or, with Wcav=None,
+    the molecular block of initialHamiltonian_Radiation(useQmatrix=True)), without a
+    dense (complex) eig.
+
+    In the plane-wave basis phi_k(j) = exp(2i*pi*k*j/N)/sqrt(N) of the ring:
+      - the damping -i*Gamma/2*Q with Q the all-ones block is N*|phi_0><phi_0|, so it only
+        shifts the bright-mode energy by -i*Gamma*N/2
+      - the cavity is one extra row/column with couplings g_k = <phi_k|Vmolcav>
+    The Hamiltonian is therefore a diagonal matrix D bordered by g. Its eigenvalues are the
+    roots of the secular equation f(z) = z - Wcav - sum_k |g_k|^2/(z - D_k) = 0 (the matrix
+    determinant lemma), with right/left eigenvectors (1, g/(z-D)) and (1, g/(conj(z)-conj(D)))
+    normalized by f'(z). Each root, exp(-i*H*t)*psi and (z-H)^-1*psi cost O(N) per eigenvalue,
+    and the site <-> plane-wave transforms are FFTs.
+
+    Degenerate ring modes (k and N-k) are combined: the combination g couples to takes part
+    in the secular equation, the orthogonal one is an exact eigenvector with unchanged energy.
+    """
+
+    def __init__(self,Nmol,Wgrd,Wmol,Vndd,Wcav=None,Vcav=0.0,Kcav=0,Gamma=0.0,chunk=512):
+        self.Nmol = Nmol
+        self.Wgrd = Wgrd
+        self.Wcav = Wcav
+        self.chunk = chunk
+        self.layout = StateLayout(Nmol,0,hasCavity=Wcav is not None)
+
+        k = np.arange(Nmol)
+        self.energies = Wmol + 2.0*Vndd*np.cos(2*np.pi*k/Nmol)
+        self.poles = self.energies.astype(complex)
+        self.poles[0] -= 1j*Gamma*Nmol/2
+
+        if Wcav is None:
+            return
+        Vmolcav = np.ones(Nmol,complex)*Vcav
+        if not Kcav==0:
+            Vmolcav = Vcav*np.exp(-1j*(Kcav*np.pi*k/Nmol))
+        self.g = self.toModes(Vmolcav)
+
+        # group the degenerate modes k and N-k
+        self.group = np.minimum(k, (Nmol-k)%Nmol)
+        groups = np.unique(self.group)
+        weight = np.zeros(Nmol)
+        np.add.at(weight, self.group, np.abs(self.g)**2)
+        weight = weight[groups]
+        coupled = weight > 1e-28*max(np.sum(weight), 1e-300)
+        self.coupledGroups = groups[coupled]
+        self.W = weight[coupled]
+        self.P = self.poles[self.coupledGroups]
+        self.groupWeight = np.zeros(Nmol)
+        self.groupWeight[self.coupledGroups] = self.W
+        self.coupledModes = np.nonzero(self.groupWeight[self.group] > 0)[0]
+        self.roots = self._secularRoots()
+        self.fprime = 1.0 + self._sum(self.roots, self.W, 2)
+
+    @classmethod
+    def fromConfig(cls,config):
+        """
+        Solver for the Hamiltonian runner.buildModel constructs (clean ring only)
+        """
+        if (config.useStaticNeighborDisorder or config.useDynamicNeighborDisorder or
+            config.useStaticDiagonalDisorder or config.useDynamicDiagonalDisorder):
+            raise ValueError("the rank-one solver needs the clean ring spectrum (no disorder)")
+        return cls(config.Nmol,config.Wgrd,config.Wmol,config.Vndd,config.Wcav,config.Vcav,config.Kcav,config.Gamma)
+
+    ### plane-wave transforms
+
+    def toModes(self,Cmol):
+        return np.fft.fft(Cmol,axis=0)/np.sqrt(self.Nmol)
+
+    def toSites(self,Cmodes):
+        return np.fft.ifft(Cmodes,axis=0)*np.sqrt(self.Nmol)
+
+    ### secular equation
+
+    def _sum(self,z,numerator,power):
+        """
+        sum_G numerator_G/(z - P_G)^power for every z, chunked to keep O(N) memory per root
+        """
+        z = np.asarray(z)
+        result = np.empty(len(z),complex)
+        for start in range(0,len(z),self.chunk):
+            inverse = 1.0/(z[start:start+self.chunk,None] - self.P[None,:])
+            if power == 2:
+                inverse *= inverse
+            result[start:start+self.chunk] = np.dot(inverse,numerator)
+        return result
+
+    def secular(self,z):
+        return np.asarray(z) - self.Wcav - self._sum(np.atleast_1d(z),self.W,1)
+
+    def _secularRoots(self,steps=16,maxiter=50,tol=1e-14,detour=0.25):
+        """
+        Real poles: one bracketed root per interval. With damping the bright pole is
+        complex; the roots are then followed from Gamma=0 by predicted complex Newton steps,
+        halving the step whenever Newton fails or two roots merge. The damping is switched on
+        along s(t) = t + i*detour*t*(1-t) rather than the real segment, which can pass through
+        an exceptional point where two roots coincide (e.g. the resonant Kcav=0 polaritons)
+        """
+        if len(self.P) == 0:
+            return np.array([self.Wcav],complex)
+        roots = secularRoots(np.real(self.P),self.W,self.Wcav).astype(complex)
+        if np.all(np.imag(self.P) == 0.0):
+            return roots
+        P = self.P
+        path = lambda t: t + 1j*detour*t*(1.0-t)
+        # start with the damped pole moving about as far as the spacing to its neighbors
+        damped = np.imag(P) != 0.0
+        spacing = np.min(np.abs(np.real(P)[damped][:,None] - np.real(P)[~damped][None,:])) if np.any(~damped) else 1.0
+        t, dt = 0.0, min(1.0/steps, max(spacing/np.max(np.abs(np.imag(P))), 1e-8))
+        while t < 1.0:
+            dt = min(dt, 1.0-t)
+            self.P = np.real(P) + 1j*path(t)*np.imag(P)
+            ds = path(t+dt) - path(t)
+            # first-order predictor dz = sum_G dP_G*W_G/(z-P_G)^2 / f'(z): a root next to
+            # the moving pole moves with it
+            fp = 1.0 + self._sum(roots,self.W,2)
+            guess = roots + self._sum(roots,1j*ds*np.imag(P)*self.W,2)/fp
+            self.P = np.real(P) + 1j*path(t+dt)*np.imag(P)
+            trial = self._newton(guess,maxiter,tol)
+            if trial is None:
+                dt /= 2
+                if dt < 1e-8:
+                    self.P = P
+                    raise RuntimeError("secular roots could not be followed to the full damping")
+                continue
+            roots, t = trial, t+dt
+            dt *= 2
+        self.P = P
+        return roots
+
+    def _newton(self,roots,maxiter,tol):
+        roots = roots.copy()
+        active = np.arange(len(roots))
+        for _ in range(maxiter):
+            z = roots[active]
+            step = (z - self.Wcav - self._sum(z,self.W,1))/(1.0 + self._sum(z,self.W,2))
+            roots[active] = z - step
+            active = active[np.abs(step) > tol*np.maximum(1.0,np.abs(z))]
+            if len(active) == 0:
+                ordered = np.sort_complex(roots)
+                if len(roots) > 1 and np.min(np.abs(np.diff(ordered))) < 1e-9*np.max(np.abs(roots)):
+                    return None         # two roots converged to the same one
+                return roots
+        return None
+
+    ### spectrum, propagator and resolvent
+
+    def eigenvalues(self):
+        """
+        All dim eigenvalues, sorted by their real part
+        """
+        if self.Wcav is None:
+            E = np.concatenate(([self.Wgrd],self.poles))
+        else:
+            # every mode keeps its energy except one per coupled group, replaced by the roots
+            keep = np.ones(self.Nmol,bool)
+            keep[self.coupledGroups] = False
+            E = np.concatenate(([self.Wgrd],self.poles[keep],self.roots))
+        return E[np.argsort(np.real(E),kind='stable')]
+
+    def _split(self,Cj):
+        Cj = np.asarray(Cj,complex).reshape(self.layout.dim)
+        cav = Cj[self.layout.cav]
+        return Cj[0], (cav[0] if len(cav) else 0.0), self.toModes(Cj[self.layout.mol])
+
+    def _join(self,grd,cav,modes):
+        Cj = np.zeros((self.layout.dim,)+np.shape(grd),complex)
+        Cj[0] = grd
+        if self.layout.hasCavity:
+            Cj[self.layout.Icav] = cav
+        Cj[self.layout.mol] = self.toSites(modes)
+        return Cj
+
+    def _coupledProjection(self,modes):
+        """
+        sum over each coupled group of conj(g_k)*psi_k, as a per-mode array
+        """
+        overlap = np.zeros(self.Nmol,complex)
+        np.add.at(overlap, self.group, np.conj(self.g)*modes)
+        return overlap
+
+    def propagate(self,Cj,times):
+        """
+        exp(-i*H*t)*Cj for every t; returns (dim, len(times))
+        """
+        times = np.atleast_1d(np.asarray(times,dtype=float))
+        grd, cav, modes = self._split(Cj)
+        phases = np.exp(-1j*np.outer(self.poles,times))             # (Nmol, Nt)
+        grd_t = grd*np.exp(-1j*self.Wgrd*times)
+        if self.Wcav is None:
+            return self._join(grd_t,0.0,modes[:,None]*phases)
+
+        # coefficients of the coupled eigenvectors: (left eigenvector . psi)/f'(z)
+        m = self.coupledModes
+        c = (cav + self._modeSum(self.roots,np.conj(self.g[m])*modes[m]))/self.fprime
+        # the part of every mode not reached by the cavity keeps its own phase
+        overlap = self._coupledProjection(modes)
+        free = modes.copy()
+        free[m] -= self.g[m]*overlap[self.group[m]]/self.groupWeight[self.group[m]]
+
+        rootPhases = c[:,None]*np.exp(-1j*np.outer(self.roots,times))     # (Nroot, Nt)
+        cav_t = np.sum(rootPhases,axis=0)
+        modes_t = free[:,None]*phases
+        for start in range(0,len(m),self.chunk):
+            part = m[start:start+self.chunk]
+            d = self.roots[None,:] - self.poles[part,None]                  # (chunk, Nroot)
+            modes_t[part] += self.g[part,None]*np.dot(1.0/d,rootPhases)
+        return self._join(grd_t,cav_t,modes_t)
+
+    def _modeSum(self,z,numerator):
+        """
+        sum_k numerator_k/(z - poles_k) over the coupled modes for every z
+        """
+        poles = self.poles[self.coupledModes]
+        result = np.empty(len(z),complex)
+        for start in range(0,len(z),self.chunk):
+            d = z[start:start+self.chunk,None] - poles[None,:]
+            result[start:start+self.chunk] = np.sum(numerator[None,:]/d,axis=1)
+        return result
+
+    def resolvent(self,z,Cj):
+        """
+        (z - H)^-1 * Cj by the Schur complement on the cavity, O(N log N)
+        """
+        grd, cav, modes = self._split(Cj)
+        inverse = 1.0/(z - self.poles)
+        if self.Wcav is None:
+            return self._join(grd/(z-self.Wgrd),0.0,inverse*modes)
+        a = (cav + np.sum(np.conj(self.g)*inverse*modes))/self.secular(z)[0]
+        return self._join(grd/(z-self.Wgrd),a,inverse*(modes + self.g*a))
+
+    def decay(self,Cj,times):
+        """
+        Survival probability |<Cj|exp(-i*H*t)|Cj>|^2 and remaining norm at every t
+        """
+        Cj = np.asarray(Cj,complex).reshape(self.layout.dim)
+        Ct = self.propagate(Cj,times)
+        return np.abs(np.dot(np.conj(Cj),Ct))**2, np.sum(np.abs(Ct)**2,axis=0)
@@ -0,0 +1,123 @@
+import numpy as np
+
+from .runner import Recorder
+
+
+class LogSchedule():
+    """
+    About Npoints records log-spaced in the step index between 0 and Ntimes-1,
+    dense at early times where the displacement changes fastest
+    """
+    def __init__(self, Ntimes, Npoints, first=1):
+        steps = np.unique(np.round(np.geomspace(first, max(Ntimes-1, first), Npoints)).astype(int))
+        self.steps = set(steps.tolist()) | {0}
+
+    def due(self, it, model):
+        return it in self.steps
+
+
+class EventSchedule():
+    """
+    Record when an observable has changed by more than a relative threshold since the last
+    record, checked every `check` steps, and at least every maxGap steps
+        EventSchedule(lambda model: model.getDisplacement(), 0.05)
+    """
+    def __init__(self, observable, threshold, check=1, maxGap=None):
+        self.observable = observable
+        self.threshold = threshold
+        self.check = check
+        self.maxGap = maxGap
+        self.last = None
+        self.lastStep = None
+
+    def due(self, it, model):
+        if self.last is not None and it%self.check != 0:
+            if self.maxGap is None or it - self.lastStep < self.maxGap:
+                return False
+        value = self.observable(model)
+        if self.last is not None:
+            change = np.abs(value - self.last)/max(np.abs(self.last), 1e-300)
+            gapReached = self.maxGap is not None and it - self.lastStep >= self.maxGap
+            if change < self.threshold and not gapReached:
+                return False
+        self.last = value
+        self.lastStep = it
+        return True
+
+
+class AnySchedule():
+    """
+    Record when any of the schedules is due (every schedule is asked, so event
+    schedules keep their reference values up to date)
+    """
+    def __init__(self, *schedules):
+        self.schedules = schedules
+
+    def due(self, it, model):
+        return any([schedule.due(it, model) for schedule in self.schedules])
+
+
+class CompressedDistributionRecorder(Recorder):
+    """
+    Population snapshots |C_mol|^2 compressed on the fly, either by keeping only the sites
+    above `threshold` (mode='support') or by summing into `bins` coarse bins (mode='bins').
+    The moments sum P, sum j*P, sum j^2*P and sum P^2 are kept at full resolution, so the
+    displacement and IPR of every snapshot are exact
+    """
+    def __init__(self, mode='support', threshold=1e-8, bins=64):
+        if mode not in ('support', 'bins'):
+            raise ValueError("unknown compression mode '{}'".format(mode))
+        self.mode = mode
+        self.threshold = threshold
+        self.bins = bins
+        self.times = []
+        self.moments = []
+        self.snapshots = []
+
+    def record(self, t, model, Javg, CJJ):
+        if hasattr(model, 'getMolecularAmplitudes'):
+            P = np.abs(model.getMolecularAmplitudes())**2
+        else:
+            P = np.abs(model.Cj[model.Imol:model.Imol+model.Nmol,0])**2
+        self.Nmol = len(P)
+        j = np.arange(len(P), dtype=float)
+        self.times.append(t)
+        self.moments.append((np.sum(P), np.dot(j,P), np.dot(j**2,P), np.dot(P,P)))
+        if self.mode == 'support':
+            index = np.nonzero(P > self.threshold)[0]
+            self.snapshots.append((index.astype(np.int32), P[index]))
+        else:
+            # site j goes to bin j*bins//Nmol; with more bins than sites some stay empty
+            index = np.arange(len(P))*self.bins//len(P)
+            self.snapshots.append(np.bincount(index, weights=P, minlength=self.bins))
+
+    def getDisplacement(self):
+        M = np.array(self.moments)
+        R = np.abs(M[:,1])    # same convention as getDisplacement of the models
+        return np.abs(M[:,2] - 2*R*M[:,1] + R**2*M[:,0])
+
+    def getIPR(self):
+        M = np.array(self.moments)
+        return M[:,0]**2/M[:,3]
+
+    def distribution(self, i):
+        """
+        Snapshot i at full length (support mode) or per bin (bins mode)
+        """
+        if self.mode == 'support':
+            index, values = self.snapshots[i]
+            P = np.zeros(self.Nmol)
+            P[index] = values
+            return P
+        return self.snapshots[i]
+
+    def write(self, filename):
+        data = {'times': np.array(self.times), 'moments': np.array(self.moments),
+                'mode': self.mode, 'Nmol': self.Nmol}
+        if self.mode == 'support':
+            data['counts'] = np.array([len(index) for index, _ in self.snapshots])
+            data['index'] = np.concatenate([index for index, _ in self.snapshots])
+            data['values'] = np.concatenate([values for _, values in self.snapshots])
+        else:
+            data['bins'] = np.array(self.snapshots)
+        np.savez_compressed(filename, **data)
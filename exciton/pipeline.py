@@ -0,0 +1,72 @@
+import copy
+import queue
+import threading
+
+import numpy as np
+
+
+# state arrays the propagators update in place; everything else is replaced, not mutated
+SNAPSHOT_ARRAYS = ('Cj', 'J0Cj', 'y')
+
+
+def snapshot(model):
+    """
+    Shallow copy of the model with its state vectors copied, so the observables can be
+    evaluated later while the original keeps propagating. The operators are shared.
+    Models that keep their state elsewhere provide their own snapshot()
+    """
+    if hasattr(model, 'snapshot'):
+        return model.snapshot()
+    snap = copy.copy(model)
+    for name in SNAPSHOT_ARRAYS:
+        value = model.__dict__.get(name)
+        if isinstance(value, np.ndarray):
+            snap.__dict__[name] = value.copy()
+    return snap
+
+
+class ObservablePipeline():
+    """
+    Hand the recorded steps to a worker thread through a bounded queue, so the observables
+    and any printing of the recorders overlap with the propagation (NumPy releases the GIL
+    in the propagation matvecs). The queue holds at most `depth` snapshots; the propagation
+    waits when the worker falls that far behind, which bounds the memory. Recorders are
+    called in the same order as without the pipeline.
+    """
+    def __init__(self, recorders, depth=8):
+        self.recorders = list(recorders)
+        self.queue = queue.Queue(maxsize=depth)
+        self.error = None
+        self.worker = threading.Thread(target=self._work, daemon=True)
+        self.worker.start()
+
+    def _work(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                return
+            if self.error is not None:
+                continue        # keep draining so the producer never blocks
+            t, model, values = item
+            try:
+                Javg, CJJ = values() if callable(values) else values
+                for recorder in self.recorders:
+                    recorder.record(t, model, Javg, CJJ)
+            except BaseException as error:
+                self.error = error
+
+    def submit(self, t, model, values):
+        """
+        values is (Javg, CJJ) or a callable returning them, evaluated in the worker
+        """
+        if self.error is not None:
+            raise self.error
+        self.queue.put((t, snapshot(model), values))
+
+    def close(self, model):
+        self.queue.put(None)
+        self.worker.join()
+        if self.error is not None:
+            raise self.error
+        for recorder in self.recorders:
+            recorder.finalize(model)
@@ -0,0 +1,159 @@
+import numpy as np
+
+
+def plotResults(config, recorder, model):
+    """
+    Plot the recorded observables against the analytical ring/polariton results.
+    matplotlib and scipy are imported here so that runs without --plot never load them
+    """
+    from matplotlib import pyplot as plt
+    from scipy import stats, special
+    from .spectrum import cavityRingSpectrum, ringSpectrum, polaritonPair, modelSpectrum, partialSpectrum, extremal, checkSpectrum
+    #plt.style.use('classic')
+    # plt.rc('text', usetex=True)
+    # plt.rc('font', family='Times New Roman', size='10')
+
+    dt, Ntimes, Nskip = config.dt, config.Ntimes, config.Nskip
+    Nmol, Wmol, Wgrd, Vndd = config.Nmol, config.Wmol, config.Wgrd, config.Vndd
+    Wcav, Vcav = config.Wcav, config.Vcav
+    model1 = model
+
+    times = recorder.times
+    Pmol1 = recorder.Pmol
+    Displacement_list = recorder.Displacement_list
+    Correlation_list = recorder.Correlation_list
+    Current_list = recorder.Current_list
+    distr_list = recorder.distr_list
+
+    distr_list = np.array(distr_list)
+
+    fig, ax= plt.subplots(1,7, figsize=(18.0,3.0))
+    ax[0].plot(times,Pmol1, '-r', lw=2, label='Q matrix', alpha=0.7)
+    # ax[0].plot(times,Pmol2, '-k', lw=2, label='Explicit', alpha=0.7)
+    ax[0].set_xlabel("time")
+    ax[0].set_ylabel("$P_{mol}$")
+    ax[0].legend()
+
+    # # cuts = [1.0,9.0]
+    # cuts = [0.0,Ntimes*dt]
+    # cut1=np.argmin(np.abs(np.array(times)-cuts[0]))
+    # cut2=np.argmin(np.abs(np.array(times)-cuts[1]))
+
+    # res = stats.linregress(np.log10(times[cut1:cut2]), np.log10(np.array(Displacement_list)[cut1:cut2]))
+    # slope = res.slope
+    # intercept = res.intercept
+    # print(slope)
+
+    # ax[1].plot(times,np.array(Displacement_list)/np.array(Pmol1)*Pmol1[0])
+    ax[1].plot(times,np.array(Displacement_list),label='numerical')
+    # ax[1].plot(times[cut1:cut2],10.0**(slope*np.log10(times[cut1:cut2])+intercept),'--',label=r'fitting: $\alpha=$'+str(round(slope,2))
+    # for j in range(Nmol):
+    #     ax2[1].plot(Xj_list[j],Vj_list[j])
+    ax[1].set_xlabel('time')
+    ax[1].set_ylabel('Displacement')
+
+    Xgrid = np.array(range(len(distr_list[0])))
+    Ygrid = times
+    Xgrid, Ygrid = np.meshgrid(Xgrid, Ygrid)
+    Zgrid = distr_list
+    CS = ax[2].contourf(Xgrid, Ygrid, Zgrid, 100, cmap=plt.cm.jet)
+    ax[2].set_xlabel('sites')
+    ax[2].set_ylabel('time')
+
+    times = np.array(times) #+dt*Nskip
+    
+    Xmean = np.zeros(len(times))
+    Xvar = np.zeros(len(times))
+    # for x_ind in range(int(Nmol/2),int(Nmol/2)+5):
+    pop_ana_list = []
+    for x_ind in range(Nmol):
+        index = x_ind-int(Nmol/2)
+        ln = ax[3].plot(times,distr_list[:,x_ind],alpha=0.5,label='numerical')
+        lncolor = ln[0].get_color()
+        
+        if Vcav==0.0:
+            pop_ana = special.jv(index,2*np.abs(Vndd)*times)**2
+        else:
+            Omega_ana = 0.5*(Wcav + Wmol - 2.0*np.abs(Vndd))
+            Delta_ana = 0.5*(Wcav - Wmol + 2.0*np.abs(Vndd))
+            energy_gap = np.sqrt(Delta_ana**2 + np.abs(Vcav)**2*Nmol)
+            coef_ana = np.exp(-1j*Wmol*times)*(1j**index)*special.jv(index,2*np.abs(Vndd)*times) \
+                    - np.exp(-1j*(Wmol-2*np.abs(Vndd))*times)/Nmol \
+                    + np.exp(-1j*Omega_ana*times)*(np.cos(energy_gap*times)+1j*Delta_ana/energy_gap*np.sin(energy_gap*times))/Nmol
+            pop_ana = np.abs(coef_ana)**2
+            # if index==0: 
+            #     print(distr_list[:,x_ind])
+            #     print(pop_ana)
+        pop_ana_list.append(pop_ana)
+        ax[3].plot(times,pop_ana,'--',color=lncolor,lw=2,alpha=0.5,label='analytical')
+    #     Xmean = Xmean + (x_ind) * pop_ana
+    #     Xvar = Xvar + (x_ind)**2 * pop_ana
+    # ax[1].plot(times,Xvar-Xmean**2,'--k',label="direct Bessel summation")
+    ax[3].set_xlabel('time')
+    ax[3].set_ylabel('population')
+
+    ### calculate the displacement using analytical result. 
+    pop_ana_list = np.array(pop_ana_list).T
+    displace_ana = []
+    for it in range(len(times)):
+        Rj = np.array(range(Nmol))
+        R =  np.abs( np.sum( Rj       *pop_ana_list[it]) ) 
+        R2 = np.abs( np.sum((Rj-R)**2 *pop_ana_list[it]) )     
+        displace_ana.append(R2)
+    ax[1].plot(times,displace_ana,'--k',label="direct Bessel summation")
+    ax[1].plot(times,0.5*(2*np.abs(Vndd)*np.array(times))**2,':',label='analytical (no cavity)')
+    ax[1].legend()
+
+    # compare against the closed-form ring/polariton spectrum without a dense eigh;
+    # an odd Kcav couples the cavity to two ring modes and has no closed-form polariton pair
+    closedForm = Vcav==0.0 or config.Kcav%2==0
+    if not closedForm:
+        print('Check eigenvalues: skipped, no closed-form spectrum for odd Kcav')
+    elif Vcav==0.0 or Nmol <= 2000:
+        eigen_ana = cavityRingSpectrum(Nmol,Wgrd,Wmol,Vndd,Wcav,Vcav,config.Kcav)
+        print('Check eigenvalues:\n',checkSpectrum(modelSpectrum(model1,useHt0=True),eigen_ana))
+    else:
+        eigen_ana = cavityRingSpectrum(Nmol,Wgrd,Wmol,Vndd,Wcav,Vcav,config.Kcav)
+        print('Check polaritons:\n',checkSpectrum(partialSpectrum(model1,useHt0=True),extremal(eigen_ana)))
+    if Vcav!=0.0:
+        Wcav_max = 5.0
+        Wcav_list = np.linspace(-Wcav_max, Wcav_max, num=101)
+        ring = np.unique(np.round(ringSpectrum(Nmol,Wmol,Vndd),12))
+        for E in ring:
+            ax[4].plot(Wcav_list,E*np.ones(len(Wcav_list)),'-')
+        if closedForm:
+            for branch in polaritonPair(Nmol,Wmol,Vndd,Wcav_list,Vcav,config.Kcav):
+                ax[4].plot(Wcav_list,branch,'-')
+        ax[4].plot(Wcav_list,(Wmol-2.0*np.abs(Vndd))*np.ones(len(Wcav_list)),'--k')
+        ax[4].plot(Wcav_list,Wcav_list,'--r')
+        ax[4].set_xlabel('$\omega_c$')
+        ax[4].set_ylabel('eigenenergy')
+        # ax[4].axvline(x=Wcav,ls='--')
+
+        # ax[5].plot(times,np.array(displace_ana)-0.5*(2*np.abs(Vndd)*np.array(times))**2)
+        # Delta_ana = 0.5*(Wcav - Wmol + 2.0*np.abs(Vndd))
+        # shift = (Nmol-1)*((Nmol-1)+1)*(2*(Nmol-1)+1)/6/(Nmol-1)**2 \
+        #         *(Delta_ana**2/(Delta_ana**2+np.abs(Vcav)**2*Nmol)+1.0)
+        # ax[5].plot(times,np.ones(len(times))*shift,'--')
+        # ax[5].set_xlabel('time')
+        # ax[5].set_ylabel('$\Delta$ displacement')
+        # ax[1].plot(times,0.5*(2*np.abs(Vndd)*np.array(times))**2+shift,':')
+        ax[5].plot(times,np.real(Correlation_list))
+        ax[5].set_xlabel('time')
+        ax[5].set_ylabel('current correlation')
+        ax[6].plot(times,np.real(Current_list),alpha=0.5)
+        ax[6].set_xlabel('time')
+        ax[6].set_ylabel('current')
+    else:# WITHOUT CAVITY
+        ax[5].plot(times,np.real(Correlation_list),alpha=0.5)
+        ax[5].set_xlabel('time')
+        ax[5].set_ylabel('current correlation')
+        ax[6].plot(times,np.real(Current_list),alpha=0.5)
+        ax[6].set_xlabel('time')
+        ax[6].set_ylabel('current')
+
+    
+    # ax[1].set_xscale('log')
+    # ax[1].set_yscale('log')
+    plt.tight_layout()
+    plt.show()
@@ -0,0 +1,496 @@
+import ast
+import json
+import platform
+import time
+from dataclasses import asdict, dataclass, field, fields, replace
+from functools import partial
+
+import numpy as np
+
+from .trajectory import SingleExcitationWithCollectiveCoupling
+from .correlation import CurrentCorrelation
+
+
+@dataclass
+class SimulationConfig():
+    """
+    Parameters of a single cavity/non-Hermitian trajectory.
+    The field names follow the variables used in param.in
+    """
+    dt: float = 0.001
+    Ntimes: int = 30000
+    Nskip: int = 10
+
+    Nmol: int = 101
+    Wmol: float = 0.0
+    Wgrd: float = -1.0
+    Vndd: float = -0.3
+
+    Wcav: float = None          # defaults to 2*Vndd (resonant with the band bottom)
+    Vcav: float = 0.0
+    Kcav: float = 0             # Kcav*pi/Nmol
+    Gamma: float = 0.0
+
+    useStaticNeighborDisorder: bool = False
+    useDynamicNeighborDisorder: bool = False
+    DeltaNN: float = 0.0
+    TauNN: float = 0.0
+
+    useStaticDiagonalDisorder: bool = False
+    useDynamicDiagonalDisorder: bool = False
+    DeltaDD: float = 0.0
+    TauDD: float = 0.0
+
+    initialState: str = 'middle'
+    initialStateArgs: dict = field(default_factory=dict)
+    propagator: str = 'RK4'
+    computeCorrelation: bool = True
+    correlationMethod: str = 'propagate'    # 'propagate' (J0Cj alongside Cj) or 'spectral' (static Ht only)
+    backend: str = 'dense'                  # 'dense', 'sparse' (CSR, sparsemodel.py), 'window' (window.py)
+                                            # or 'eigenbasis' (eigenbasis.py, static disorder, with
+                                            # propagator='eigenbasis' and correlationMethod='spectral')
+    seed: int = None                        # drawn by Simulation when None, see writeManifest
+    cacheDir: str = None                    # reuse operators/eigenbases from a cache.DiskCache
+    pipelineDepth: int = 0                  # >0: evaluate observables in a worker thread (pipeline.py)
+
+    def __post_init__(self):
+        if self.Wcav is None:
+            self.Wcav = 0.0 + 2.0*self.Vndd
+
+    @classmethod
+    def fromDict(cls, params):
+        """
+        Build a config from a dict, ignoring keys that are not config fields
+        """
+        names = {f.name for f in fields(cls)}
+        return cls(**{key: value for key, value in params.items() if key in names})
+
+    @classmethod
+    def fromFile(cls, filename='param.in'):
+        """
+        Read a param.in file without exec: only plain assignments are accepted (import lines
+        are skipped) and the right-hand sides may refer to previously assigned names, np and
+        the numeric builtins in PARAM_BUILTINS
+        """
+        with open(filename) as f:
+            params = parseParamFile(f.read())
+        return cls.fromDict(params)
+
+
+# builtins available to the right-hand sides of param.in
+PARAM_BUILTINS = {'int': int, 'float': float, 'bool': bool, 'abs': abs, 'round': round,
+                  'min': min, 'max': max, 'True': True, 'False': False, 'None': None}
+
+
+def parseParamFile(text):
+    namespace = {'np': np, 'pi': np.pi}
+    params = {}
+    for node in ast.parse(text).body:
+        if isinstance(node, (ast.Import, ast.ImportFrom)):
+            continue            # np is always available
+        if not isinstance(node, ast.Assign) or not all(isinstance(t, ast.Name) for t in node.targets):
+            raise ValueError("param file may only contain assignments, got line {}".format(node.lineno))
+        value = eval(compile(ast.Expression(node.value), '<param>', 'eval'), {'__builtins__': PARAM_BUILTINS}, namespace)
+        for target in node.targets:
+            namespace[target.id] = value
+            params[target.id] = value
+    return params
+
+
+INITIAL_STATES = {
+    'middle':        lambda model, **kw: model.initialCj_middle(),
+    'bright':        lambda model, **kw: model.initialCj_Bright(),
+    'cavity':        lambda model, **kw: model.initialCj_Cavity(),
+    'ground':        lambda model, **kw: model.initialCj_Ground(),
+    'random':        lambda model, **kw: model.initialCj_Random(),
+    'gaussian':      lambda model, width=2.0, k0=0.0, center=None, **kw: model.initialCj_Gaussian(width,k0,center),
+    'boltzman':      lambda model, hbar=1.0, kBT=1.0, most_prob=False, **kw: model.initialCj_Boltzman(hbar,kBT,most_prob=most_prob),
+    'polariton':     lambda model, initial_state=0, **kw: model.initialCj_Polariton(initial_state),
+    'eigenstate':    lambda model, initial_state=0, **kw: model.initialCj_Eigenstate_Hmol(initial_state),
+}
+
+BACKENDS = ('dense', 'sparse', 'window', 'eigenbasis')
+
+# the moving window only represents states that are uniform away from a packet
+WINDOW_INITIAL_STATES = ('middle', 'gaussian', 'bright', 'cavity', 'ground')
+
+# these diagonalize a dense block of Ht and are not available with the CSR Hamiltonian
+DENSE_INITIAL_STATES = ('boltzman', 'polariton', 'eigenstate')
+
+
+def modelClass(backend):
+    """
+    Hamiltonian backend; the sparse one pulls in scipy, so import it only when asked for
+    """
+    if backend == 'dense':
+        return SingleExcitationWithCollectiveCoupling
+    if backend == 'sparse':
+        from .sparsemodel import SparseSingleExcitationWithCollectiveCoupling
+        return SparseSingleExcitationWithCollectiveCoupling
+    if backend == 'window':
+        from .window import MovingWindowSingleExcitation
+        return MovingWindowSingleExcitation
+    if backend == 'eigenbasis':
+        from .eigenbasis import EigenbasisSingleExcitationWithCollectiveCoupling
+        return EigenbasisSingleExcitationWithCollectiveCoupling
+    raise ValueError("unknown backend '{}'".format(backend))
+
+
+PROPAGATORS = {
+    'RK4':  lambda model, dt: model.propagateCj_RK4(dt),
+    'dHdt': lambda model, dt: model.propagateCj_dHdt(dt),
+    'eigenbasis': lambda model, dt: model.propagateCj_Eigenbasis(dt),
+}
+
+
+def validateConfig(config):
+    """
+    Reject unknown options and unsupported backend/propagator/correlation/disorder
+    combinations before anything is built
+    """
+    dynamic = config.useDynamicNeighborDisorder or config.useDynamicDiagonalDisorder
+    disordered = dynamic or config.useStaticNeighborDisorder or config.useStaticDiagonalDisorder
+    spectral = config.computeCorrelation and config.correlationMethod == 'spectral'
+
+    if config.backend not in BACKENDS:
+        raise ValueError("unknown backend '{}'".format(config.backend))
+    if config.propagator != 'exact' and config.propagator not in PROPAGATORS:
+        raise ValueError("unknown propagator '{}'".format(config.propagator))
+    if config.initialState not in INITIAL_STATES:
+        raise ValueError("unknown initial state '{}'".format(config.initialState))
+    if config.computeCorrelation and config.correlationMethod not in ('propagate', 'spectral'):
+        raise ValueError("unknown correlation method '{}'".format(config.correlationMethod))
+
+    if dynamic and config.propagator == 'exact':
+        raise ValueError("the exact propagator requires a static Hamiltonian")
+    if dynamic and spectral:
+        raise ValueError("spectral correlation requires a static Hamiltonian")
+    if config.propagator == 'eigenbasis' and config.backend != 'eigenbasis':
+        raise ValueError("propagator='eigenbasis' requires backend='eigenbasis'")
+    if config.backend == 'eigenbasis':
+        if dynamic:
+            raise ValueError("backend='eigenbasis' requires a static Hamiltonian (no dynamic disorder)")
+        if config.propagator != 'eigenbasis':
+            raise ValueError("backend='eigenbasis' requires propagator='eigenbasis'")
+        # 'propagate' reads Cj, and so back-transforms it, on every step
+        if config.computeCorrelation and config.correlationMethod != 'spectral':
+            raise ValueError("backend='eigenbasis' requires correlationMethod='spectral' "
+                             "(or computeCorrelation=False)")
+
+    if config.backend == 'sparse' and config.initialState in DENSE_INITIAL_STATES:
+        raise ValueError("initial state '{}' requires a dense backend".format(config.initialState))
+
+    if config.backend == 'window':
+        if config.Kcav != 0:
+            raise ValueError("backend='window' needs a uniform cavity coupling (Kcav=0)")
+        if disordered:
+            raise ValueError("backend='window' assumes a clean ring (no disorder)")
+        if config.computeCorrelation:
+            raise ValueError("backend='window' has no current correlation, set computeCorrelation=False")
+        if config.propagator != 'RK4':
+            raise ValueError("backend='window' only supports propagator='RK4'")
+        if config.initialState not in WINDOW_INITIAL_STATES:
+            raise ValueError("backend='window' supports the initial states {}, got '{}'".format(
+                             ', '.join(WINDOW_INITIAL_STATES), config.initialState))
+
+
+def buildHamiltonian(config):
+    """
+    Construct the Hamiltonian and apply the initial disorder
+    """
+    model = modelClass(config.backend)(config.Nmol,0,seed=config.seed)
+    model.initialHamiltonian_Cavity_nonHermitian(config.Wgrd,config.Wcav,config.Wmol,config.Vndd,
+                                                 config.Vcav,config.Kcav,Gamma=config.Gamma)
+
+    if config.useStaticNeighborDisorder:
+        model.updateNeighborStaticDisorder(config.DeltaNN)
+    if config.useDynamicNeighborDisorder:
+        model.updateNeighborDynamicDisorder(config.DeltaNN,config.TauNN,config.dt)
+    if config.useStaticDiagonalDisorder:
+        model.updateDiagonalStaticDisorder(config.DeltaDD)
+    if config.useDynamicDiagonalDisorder:
+        model.updateDiagonalDynamicDisorder(config.DeltaDD,config.TauDD,config.dt)
+    return model
+
+
+def buildModel(config, cache=None):
+    """
+    Construct the Hamiltonian, apply the initial disorder and prepare the initial state;
+    with a cache.DiskCache the disordered operators are loaded when available
+    """
+    model = None
+    if cache is not None:
+        from .cache import cacheable, loadModel, saveModel
+        if cacheable(config):
+            model = loadModel(cache, config, modelClass(config.backend))
+            if model is None:
+                model = buildHamiltonian(config)
+                saveModel(cache, config, model)
+    if model is None:
+        model = buildHamiltonian(config)
+
+    if config.initialState not in INITIAL_STATES:
+        raise ValueError("unknown initial state '{}'".format(config.initialState))
+    INITIAL_STATES[config.initialState](model, **config.initialStateArgs)
+    return model
+
+
+def drawSeed():
+    """
+    Fresh seed for an unseeded run, in the range accepted by np.random.seed
+    """
+    return int(np.random.SeedSequence().generate_state(1)[0])
+
+
+def cacheableConfig(config):
+    from .cache import cacheable
+    return cacheable(config)
+
+
+class StrideSchedule():
+    """
+    Record every Nskip-th step (the default schedule)
+    """
+    def __init__(self, Nskip):
+        self.Nskip = Nskip
+
+    def due(self, it, model):
+        return it%self.Nskip==0
+
+
+class Recorder():
+    """
+    Base class of the recorders called by Simulation whenever the schedule is due
+    """
+    def record(self, t, model, Javg, CJJ):
+        pass
+
+    def finalize(self, model):
+        pass
+
+
+class ObservableRecorder(Recorder):
+    """
+    Keep the same time series that the main script used to collect
+    """
+    def __init__(self, keepDistribution=True):
+        self.keepDistribution = keepDistribution
+        self.times = []
+        self.Pmol = []
+        self.IPR = []
+        self.distr_list = []
+        self.Displacement_list = []
+        self.Correlation_list = []
+        self.Current_list = []
+
+    def record(self, t, model, Javg, CJJ):
+        self.times.append( t )
+        self.Pmol.append( model.getPopulation_system() )
+        self.IPR.append( model.getIPR() )
+        if self.keepDistribution:
+            distr = np.abs(model.Cj[model.Imol:model.Imol+model.Nmol])**2
+            self.distr_list.append(distr[:,0])
+        self.Displacement_list.append(model.getDisplacement())
+        self.Correlation_list.append(CJJ)
+        self.Current_list.append(Javg)
+
+    def write(self, suffix=''):
+        """
+        Write Pmol.dat, Displacement.dat and Correlation.dat (+suffix) and return the file names
+        """
+        with open('Pmol.dat'+suffix, 'w') as fpop:
+            for it in range(len(self.times)):
+                fpop.write("{t}\t{Pmol}\n".format(t=self.times[it],Pmol=self.Pmol[it]))
+
+        with open('Displacement.dat'+suffix, 'w') as fdis:
+            for it in range(len(self.times)):
+                fdis.write("{t}\t{Displacement}\n".format(t=self.times[it],Displacement=self.Displacement_list[it]))
+
+        with open('Correlation.dat'+suffix, 'w') as fcorr:
+            for it in range(len(self.times)):
+                fcorr.write("{t}\t{Corr_real}\t{Corr_imag}\n".format(t=self.times[it],
+                            Corr_real=np.real(self.Correlation_list[it]),Corr_imag=np.imag(self.Correlation_list[it])))
+        return ['Pmol.dat'+suffix, 'Displacement.dat'+suffix, 'Correlation.dat'+suffix]
+
+
+class PrintRecorder(Recorder):
+    """
+    Print time, displacement and molecular population to stdout (the old --print)
+    """
+    def record(self, t, model, Javg, CJJ):
+        print("{t}\t{d}\t{dP}".format(t=t,d=model.getDisplacement(),dP=model.getPopulation_system()))
+
+
+def spectralValues(spectral, c, t):
+    """
+    (Javg, CJJ) at time t from the eigenbasis of the static Hamiltonian, for the
+    coefficients c = spectral.coefficients(Cj0) of the initial state
+    """
+    return spectral.current(None, [t], c=c)[0], spectral.correlation(None, [t], c=c)[0,0]
+
+
+class Simulation():
+    """
+    Run one trajectory for a SimulationConfig and feed the recorders
+
+        sim = Simulation(config, [ObservableRecorder()])
+        sim.run()
+    """
+    def __init__(self, config, recorders=None, model=None, schedule=None):
+        validateConfig(config)
+        self.config = config
+        self.recorders = list(recorders) if recorders is not None else [ObservableRecorder()]
+        self.schedule = schedule if schedule is not None else StrideSchedule(config.Nskip)
+        # decided before a seed is drawn: disorder from a drawn seed is never reused
+        self.cache = None
+        if config.cacheDir is not None and cacheableConfig(config):
+            from .cache import DiskCache
+            self.cache = DiskCache(config.cacheDir)
+        if model is None and config.seed is None:
+            # the caller's config stays unseeded, so reusing it gives a new realization;
+            # self.config records the seed actually used (pass it to writeManifest)
+            config = replace(config, seed=drawSeed())
+            self.config = config
+        start = time.perf_counter()
+        self.model = model if model is not None else buildModel(config, self.cache)
+        self.timings = {'build': time.perf_counter() - start}
+        if config.propagator == 'exact':
+            self.propagate = self._exactPropagator()
+        else:
+            self.propagate = PROPAGATORS[config.propagator]
+
+    def _eigenEngine(self):
+        """
+        CurrentCorrelation of the static Ht, diagonalized once per Simulation
+        """
+        if not hasattr(self, '_engine'):
+            self._engine = CurrentCorrelation.fromModel(self.model)
+        return self._engine
+
+    def _exactPropagator(self, tau=None):
+        """
+        Multiply by U(tau) = exp(-i Ht tau) of the static Hamiltonian, tau = dt by default
+        (cached when a cache is set)
+        """
+        config = self.config
+        tau = config.dt if tau is None else tau
+        if self.cache is not None:
+            from .cache import cachedPropagator
+            U = cachedPropagator(self.cache, config, self.model, tau)
+        else:
+            U = self._eigenEngine().propagator(tau)
+        U = np.ascontiguousarray(U)
+
+        def propagate(model, dt):
+            model.Cj[...] = np.dot(U, model.Cj)
+        return propagate
+
+    def _strideJumps(self):
+        """
+        With the exact propagator and nothing evaluated between the recorded steps (static Ht,
+        no propagated J0Cj, the default stride schedule) the loop can jump a whole stride
+        """
+        config = self.config
+        return (config.propagator == 'exact' and type(self.schedule) is StrideSchedule and
+                not (config.computeCorrelation and config.correlationMethod == 'propagate'))
+
+    def run(self):
+        config = self.config
+        model = self.model
+        dt = config.dt
+        start = time.perf_counter()
+        Javg, CJJ = 0.0, 0.0
+        pipeline = None
+        if config.pipelineDepth > 0:
+            from .pipeline import ObservablePipeline
+            pipeline = ObservablePipeline(self.recorders, config.pipelineDepth)
+
+        propagateJ0Cj = config.computeCorrelation and config.correlationMethod == 'propagate'
+        spectral = None
+        if config.computeCorrelation and config.correlationMethod == 'spectral':
+            if self.cache is not None:
+                from .cache import cachedCurrentCorrelation
+                spectral = cachedCurrentCorrelation(self.cache, config, model)
+            else:
+                spectral = self._eigenEngine()
+            c0 = spectral.coefficients(model.Cj)
+
+        def record(it, Javg, CJJ):
+            values = (Javg, CJJ)
+            if spectral is not None:
+                values = partial(spectralValues, spectral, c0, it*dt)
+            if pipeline is not None:
+                pipeline.submit(it*dt, model, values)
+                return
+            if spectral is not None:
+                Javg, CJJ = values()
+            for recorder in self.recorders:
+                recorder.record(it*dt, model, Javg, CJJ)
+
+        if self._strideJumps():
+            # the state recorded at it*dt has been propagated it+1 steps, as in the loop below
+            Nskip = self.schedule.Nskip
+            jump = self._exactPropagator(Nskip*dt)
+            recorded = range(0, config.Ntimes, Nskip)
+            for it in recorded:
+                if it == 0:
+                    self.propagate(model, dt)
+                else:
+                    jump(model, Nskip*dt)
+                record(it, Javg, CJJ)
+            for it in range(recorded[-1]+1 if len(recorded) else 0, config.Ntimes):
+                self.propagate(model, dt)
+        else:
+            for it in range(config.Ntimes):
+
+                if config.useDynamicNeighborDisorder:
+                    model.updateNeighborDynamicDisorder(config.DeltaNN,config.TauNN,dt)
+                if config.useDynamicDiagonalDisorder:
+                    model.updateDiagonalDynamicDisorder(config.DeltaDD,config.TauDD,dt)
+
+                if propagateJ0Cj:
+                    Javg, CJJ = model.getCurrentCorrelation()
+
+                self.propagate(model, dt)
+                if propagateJ0Cj:
+                    model.propagateJ0Cj_RK4(dt)
+
+                if self.schedule.due(it, model):
+                    record(it, Javg, CJJ)
+
+        if pipeline is not None:
+            pipeline.close(model)
+        else:
+            for recorder in self.recorders:
+                recorder.finalize(model)
+        self.timings['run'] = time.perf_counter() - start
+        return self.recorders
+
+
+def runSimulation(config, recorders=None):
+    """
+    Convenience wrapper: build, run and return the recorders
+    """
+    return Simulation(config, recorders).run()
+
+
+def writeManifest(filename, config, timings=None, outputs=()):
+    """
+    Compact JSON record of a run next to its outputs: all parameters, the seed, propagator
+    and backend, the timings of Simulation and the output files, so runs can be indexed
+    and reused. For unseeded runs pass sim.config, which holds the seed Simulation drew,
+    so the recorded seed reproduces the run
+    """
+    manifest = {
+        'parameters':   asdict(config),
+        'seed':         config.seed,
+        'propagator':   config.propagator,
+        'backend':      config.backend,
+        'timings':      dict(timings or {}),
+        'outputs':      list(outputs),
+        'created':      time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'versions':     {'python': platform.python_version(), 'numpy': np.__version__},
+    }
+    with open(filename, 'w') as f:
+        json.dump(manifest, f, indent=1, default=repr)
+    return manifest
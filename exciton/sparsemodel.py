@@ -0,0 +1,251 @@
+import numpy as np
+from scipy import sparse
+
+from .trajectory import SingleExcitationWithCollectiveCoupling, StateLayout
+
+
+def ringCouplings(Nmol, Vndd):
+    """
+    Nearest-neighbor ring, bonds ordered (j,j+1) with the wrap bond (Nmol-1,0) last,
+    the same order as Vstc/Xdyn in SingleExcitationWithCollectiveCoupling
+    """
+    bonds = np.array([(j, (j+1)%Nmol) for j in range(Nmol)])
+    values = np.full(Nmol, Vndd, complex)
+    positions = np.arange(Nmol, dtype=float)[:,None]
+    displacements = np.ones((Nmol,1))
+    return bonds, values, positions, displacements
+
+
+def latticeCouplings(shape, Vndd, periodic=True):
+    """
+    Nearest-neighbor hypercubic lattice (2-D/3-D) in row-major site order
+    """
+    shape = tuple(shape)
+    index = np.arange(int(np.prod(shape))).reshape(shape)
+    positions = np.array(np.unravel_index(np.arange(index.size), shape), dtype=float).T
+    bonds, displacements = [], []
+    for axis, L in enumerate(shape):
+        neighbor = np.roll(index, -1, axis=axis)
+        sites = index
+        if not periodic:
+            keep = [slice(None)]*len(shape)
+            keep[axis] = slice(0, L-1)
+            neighbor, sites = neighbor[tuple(keep)], index[tuple(keep)]
+        bonds.append(np.stack((sites.ravel(), neighbor.ravel()), axis=1))
+        d = np.zeros((sites.size, len(shape)))
+        d[:,axis] = 1.0
+        displacements.append(d)
+    bonds = np.vstack(bonds)
+    return bonds, np.full(len(bonds), Vndd, complex), positions, np.vstack(displacements)
+
+
+def dipolarCouplings(positions, Vdd, cutoff=np.inf, box=None):
+    """
+    Long-range couplings Vdd/r^3 between all pairs closer than cutoff,
+    with minimum-image distances when a periodic box is given
+    """
+    positions = np.asarray(positions, dtype=float)
+    if positions.ndim == 1:
+        positions = positions[:,None]
+    bonds, values, displacements = [], [], []
+    for i in range(len(positions)-1):
+        d = positions[i+1:] - positions[i]
+        if box is not None:
+            d -= np.asarray(box)*np.round(d/np.asarray(box))
+        r = np.linalg.norm(d, axis=1)
+        keep = r < cutoff
+        j = np.arange(i+1, len(positions))[keep]
+        bonds.append(np.stack((np.full(len(j), i), j), axis=1))
+        values.append(Vdd/r[keep]**3)
+        displacements.append(d[keep])
+    return np.vstack(bonds), np.concatenate(values).astype(complex), positions, np.vstack(displacements)
+
+
+def _csrPositions(mat, rows, cols):
+    """
+    Positions of the (rows, cols) entries inside mat.data (canonical CSR)
+    """
+    pos = np.empty(len(rows), dtype=np.int64)
+    for k, (r, c) in enumerate(zip(rows, cols)):
+        start, stop = mat.indptr[r], mat.indptr[r+1]
+        pos[k] = start + np.searchsorted(mat.indices[start:stop], c)
+    return pos
+
+
+class SparseSingleExcitationWithCollectiveCoupling(SingleExcitationWithCollectiveCoupling):
+    """
+    Same model on an arbitrary coupling graph with Ht, Jt and dHdt stored as CSR matrices.
+
+    The backend interface used by the runner is the one of the dense class:
+    initialHamiltonian_*, update*Disorder, initialCj_*, propagate*_RK4, get*.
+    Disorder writes into Ht.data in place through precomputed index arrays, and the
+    all-ones Q block is never formed: -i*Gamma/2*Q*C = -i*Gamma/2*sum(C_mol) on every
+    molecule, applied in the matvec. Qmat is therefore an empty CSR matrix and Ht does
+    not contain the damping.
+    """
+
+    def initialHamiltonian_Cavity_nonHermitian(self,Wgrd,Wcav,Wmol,Vndd,Vcav,Kcav,Gamma=0.0):
+        """
+        Ring geometry, equivalent to the dense constructor
+        """
+        bonds, values, positions, displacements = ringCouplings(self.Nmol, Vndd)
+        self.initialHamiltonian_Graph(Wgrd,Wcav,Wmol,bonds,values,positions,displacements,Vcav,Kcav,Gamma)
+
+    def initialHamiltonian_Graph(self,Wgrd,Wcav,Wmol,bonds,values,positions,displacements,Vcav,Kcav=0,Gamma=0.0,currentAxis=0):
+        """
+        Construct
+            | grd     | cav     | mol
+        grd | Hgrd    |         |
+        cav |         | Hcav    | Vmolcav^+
+        mol |         | Vmolcav | Hmol (bonds) - i*Gamma/2*Q
+        from a list of bonds (i,j) with couplings values[b] and bond vectors displacements[b]
+        """
+        self.useQmatrix = True
+        self.Wmol = Wmol
+        self.Gamma = Gamma
+        self.Icav = 1
+        self.Imol = 2
+        self.layout = StateLayout(self.Nmol,0,hasCavity=True)
+        dim = self.layout.dim
+
+        self.bonds = np.asarray(bonds)
+        self.Rj = np.asarray(positions, dtype=float).reshape(self.Nmol, -1)
+        self.bondVectors = np.asarray(displacements, dtype=float).reshape(len(self.bonds), -1)
+        self.currentAxis = currentAxis
+
+        Vmolcav = np.ones(self.Nmol,complex) * Vcav
+        if not Kcav==0:
+            Vmolcav = Vcav*np.exp(-1j*(Kcav*np.pi*np.arange(self.Nmol)/self.Nmol))
+
+        mol = self.Imol + np.arange(self.Nmol)
+        bi = self.Imol + self.bonds[:,0]
+        bj = self.Imol + self.bonds[:,1]
+        rows = np.concatenate(([0, self.Icav], mol, np.full(self.Nmol, self.Icav), mol, bi, bj))
+        cols = np.concatenate(([0, self.Icav], mol, mol, np.full(self.Nmol, self.Icav), bj, bi))
+        data = np.concatenate(([Wgrd, Wcav], np.full(self.Nmol, Wmol), np.conj(Vmolcav), Vmolcav,
+                               values, np.conj(values))).astype(complex)
+        self.Ht = sparse.coo_matrix((data,(rows,cols)),shape=(dim,dim)).tocsr()
+        self.Ht.sum_duplicates()
+        self.Ht.sort_indices()
+
+        self.diagIndex = _csrPositions(self.Ht, mol, mol)
+        self.bondIndex = _csrPositions(self.Ht, bi, bj)
+        self.bondIndexT = _csrPositions(self.Ht, bj, bi)
+        self.Ht0data = self.Ht.data.copy()
+
+        self.Jt = self.Ht.copy()
+        self.dHdt = self.Ht.copy()
+        self.dHdt.data[:] = 0.0
+        self._updateCurrent()
+        self.Jt0 = self.Jt.copy()
+        self.Ht0 = self.Ht.copy()
+        self.Qmat = sparse.csr_matrix((dim,dim),dtype=complex)
+
+        self.molSlice = self.layout.mol
+
+    def _updateCurrent(self):
+        """
+        J = i*sum_b H_ij d_b |i><j| + h.c. along currentAxis, sharing the sparsity of Ht
+        """
+        d = self.bondVectors[:,self.currentAxis]
+        self.Jt.data[:] = 0.0
+        self.Jt.data[self.bondIndex]  = 1j*self.Ht.data[self.bondIndex]*d
+        self.Jt.data[self.bondIndexT] =-1j*self.Ht.data[self.bondIndexT]*d
+
+    def _resetHt(self):
+        self.Ht.data[:] = self.Ht0data
+
+    def _addBonds(self, dV):
+        self.Ht.data[self.bondIndex]  += dV
+        self.Ht.data[self.bondIndexT] += np.conj(dV)
+
+    def updateDiagonalStaticDisorder(self,Delta):
+        self._resetHt()
+        self.Wstc = np.random.normal(0.0,Delta,self.Nmol) + self.Wmol
+        self.Ht.data[self.diagIndex] += self.Wstc
+
+    def updateDiagonalDynamicDisorder(self,Delta,TauC,dt):
+        self._resetHt()
+        if not hasattr(self, 'Wdyn'):
+            self.Wdyn = np.random.normal(0.0,Delta,self.Nmol) + self.Wmol
+        else:
+            ri = np.exp(-dt/TauC) * (TauC>0.0)
+            mean_it = ri*self.Wdyn
+            sigma_it = Delta*np.sqrt(1.0-ri**2)
+            self.Wdyn = np.random.normal(mean_it,sigma_it,self.Nmol) + self.Wmol
+        self.Ht.data[self.diagIndex] += self.Wdyn
+
+    def updateNeighborStaticDisorder(self,Delta):
+        self._resetHt()
+        if not hasattr(self, 'Vstc'):
+            self.Vstc = np.random.normal(0.0,Delta,len(self.bonds))
+        self._addBonds(self.Vstc)
+
+    def updateNeighborDynamicDisorder(self,Delta,TauC,dt):
+        self._resetHt()
+        if not hasattr(self, 'Xdyn'):
+            self.Xdyn = np.random.normal(0.0,1.0,self.Nmol)
+        else:
+            ri = np.exp(-dt/TauC) * (TauC>0.0)
+            mean_it = ri*self.Xdyn
+            sigma_it = np.sqrt(1.0-ri**2)
+            self.Xdyn = np.random.normal(mean_it,sigma_it,self.Nmol)
+        self._addBonds(Delta*(self.Xdyn[self.bonds[:,1]]-self.Xdyn[self.bonds[:,0]]))
+
+    def updateNeighborHarmonicOscillator(self,staticCoup,dynamicCoup):
+        self._resetHt()
+        self.staticCoup = staticCoup
+        self.dynamicCoup = dynamicCoup
+        i, j = self.bonds[:,0], self.bonds[:,1]
+        self._addBonds(-self.staticCoup + self.dynamicCoup * (self.Xj[j]-self.Xj[i]))
+        self.dHdt.data[self.bondIndex]  = self.dynamicCoup * (self.Vj[j]-self.Vj[i])
+        self.dHdt.data[self.bondIndexT] = self.dynamicCoup * (self.Vj[j]-self.Vj[i])
+
+    def applyHt(self, C, out=None):
+        """
+        Ht*C including the rank-one damping -i*Gamma/2*Q. scipy has no in-place sparse
+        matvec, so the product is copied into out
+        """
+        HC = self.Ht.dot(C)
+        if self.Gamma != 0.0:
+            HC[self.molSlice] += -1j*(self.Gamma/2)*np.sum(C[self.molSlice], axis=0)
+        if out is None:
+            return HC
+        out[...] = HC
+        return out
+
+    def denseOperators(self):
+        """
+        Dense (Ht, Jt) with the damping added back to Ht, for the eigendecomposition in
+        correlation.CurrentCorrelation and the exact propagator
+        """
+        Ht = self.Ht.toarray()
+        Ht[self.molSlice,self.molSlice] += -1j*(self.Gamma/2)
+        self._updateCurrent()
+        return Ht, self.Jt.toarray()
+
+    def propagateCj_dHdt(self,dt):
+        HC = self.applyHt(self.Cj)
+        self.Cj = self.Cj - 1j*dt*HC \
+                   -0.5*dt**2*self.applyHt(HC) \
+                   -0.5*1j*dt**2*self.dHdt.dot(self.Cj)
+
+    def getDisplacement(self):
+        """
+        Mean-square spread sum_d <(R_d - <R_d>)^2> of the molecular population
+        """
+        P = np.abs(self.Cj[self.molSlice,0])**2
+        R = np.abs(P @ self.Rj)
+        return np.abs(np.sum(P[:,None]*(self.Rj-R)**2))
+
+    def getCurrentCorrelation(self):
+        if hasattr(self, 'J0Cj'):
+            self._updateCurrent()
+        else: #first step only
+            self.J0Cj = self.Jt0.dot(self.Cj)
+            self.Jt = self.Jt0.copy()
+
+        JtCj = self.Jt.dot(self.Cj)
+        CJJ = np.vdot(self.Cj, self.Jt.dot(self.J0Cj))
+        Javg = np.vdot(self.Cj, JtCj)
+        return Javg, CJJ
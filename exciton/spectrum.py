@@ -0,0 +1,204 @@
+import numpy as np
+
+
+def ringSpectrum(Nmol, Wmol, Vndd):
+    """
+    Closed-form spectrum of the clean ring, E_k = Wmol + 2*Vndd*cos(2*pi*k/Nmol), k = 1..Nmol
+    (k = Nmol is the bright mode Wmol + 2*Vndd)
+    """
+    return Wmol + 2.0*Vndd*np.cos(2*np.pi*np.arange(1,Nmol+1)/Nmol)
+
+
+def circulantSpectrum(firstRow):
+    """
+    Spectrum of any Hermitian circulant block (e.g. a ring with longer-range couplings) by FFT
+    """
+    return np.real(np.fft.fft(np.conj(firstRow)))
+
+
+def polaritonPair(Nmol, Wmol, Vndd, Wcav, Vcav, Kcav=0):
+    """
+    Upper and lower polariton from the 2x2 problem of the cavity and the ring mode it
+    couples to (the bright k=0 mode for Kcav=0, the k=Kcav/2 mode for even Kcav).
+    Wcav may be an array, e.g. for a cavity-frequency scan
+    """
+    if Kcav % 2:
+        raise ValueError("odd Kcav does not couple the cavity to a single ring mode")
+    Ebright = Wmol + 2.0*Vndd*np.cos(np.pi*Kcav/Nmol)
+    Wcav = np.asarray(Wcav, dtype=float)
+    center = 0.5*(Wcav + Ebright)
+    energy_gap = np.sqrt(0.25*(Wcav - Ebright)**2 + np.abs(Vcav)**2*Nmol)
+    return center + energy_gap, center - energy_gap
+
+
+def cavityRingSpectrum(Nmol, Wgrd, Wmol, Vndd, Wcav, Vcav, Kcav=0):
+    """
+    Sorted spectrum of the clean grd+cav+ring Hamiltonian (Gamma=0) without diagonalization
+    """
+    ring = ringSpectrum(Nmol, Wmol, Vndd)
+    if Vcav == 0.0:
+        return np.sort(np.concatenate(([Wgrd, Wcav], ring)))
+    # remove the coupled ring mode and replace it by the polariton pair
+    k = (Nmol - Kcav//2) % Nmol
+    ring = np.delete(ring, (k-1) % Nmol)
+    upper, lower = polaritonPair(Nmol, Wmol, Vndd, Wcav, Vcav, Kcav)
+    return np.sort(np.concatenate(([Wgrd], ring, [upper, lower])))
+
+
+def zigzagOrder(Nmol):
+    """
+    Site order 0, N-1, 1, N-2, ... that turns the periodic ring into a band of half-width 2
+    """
+    order = np.empty(Nmol, dtype=int)
+    order[0::2] = np.arange((Nmol+1)//2)
+    order[1::2] = Nmol-1-np.arange(Nmol//2)
+    return order
+
+
+def ringBand(diag, off):
+    """
+    Lower banded storage (for scipy.linalg.eig_banded) of the ring with on-site energies diag
+    and couplings off[j] between j and j+1 (off[-1] is the wrap bond N-1 -> 0), in zigzag order
+    """
+    Nmol = len(diag)
+    order = zigzagOrder(Nmol)
+    position = np.empty(Nmol, dtype=int)
+    position[order] = np.arange(Nmol)
+    band = np.zeros((3,Nmol), complex)
+    band[0] = diag[order]
+    for j in range(Nmol):
+        a, b = position[j], position[(j+1)%Nmol]
+        # lower triangle: H[j+1,j] = conj(off[j]) if j+1 comes later in the order, else H[j,j+1]
+        value = np.conj(off[j]) if a < b else off[j]
+        lo, hi = min(a,b), max(a,b)
+        band[hi-lo, lo] += value
+    return band, order
+
+
+def _hermitianEntries(model, rows, cols, useHt0=False):
+    H = np.asarray((model.Ht0 if useHt0 else model.Ht)[rows, cols]).ravel()
+    if hasattr(model, 'Qmat'):
+        H = H - np.asarray(model.Qmat[rows, cols]).ravel()
+    return H
+
+
+def _hermitianOperator(model, useHt0=False):
+    Ht = model.Ht0 if useHt0 else model.Ht
+    if hasattr(model, 'Qmat'):
+        return Ht - model.Qmat
+    return Ht
+
+
+def modelSpectrum(model, useHt0=False):
+    """
+    Eigenvalues of the Hermitian part of the grd+cav+ring Hamiltonian of a model with
+    arbitrary diagonal/neighbor disorder. Without cavity coupling the ring is diagonalized
+    as a band matrix of half-width 2 (eigenvalues only, no O(N^3) dense eigh). A coupled
+    cavity makes the matrix dense-bordered; use partialSpectrum for large Nmol in that case.
+    useHt0 checks the Hamiltonian before disorder
+    """
+    from scipy.linalg import eig_banded
+
+    Nmol, Imol = model.Nmol, model.Imol
+    Ht = model.Ht0 if useHt0 else model.Ht
+    Wgrd = np.real(Ht[0,0])
+    extra = [Wgrd]
+    if hasattr(model, 'Icav'):
+        mol = Imol + np.arange(Nmol)
+        v = _hermitianEntries(model, mol, np.full(Nmol, model.Icav), useHt0)
+        if not np.allclose(v, 0.0):
+            H = _hermitianOperator(model, useHt0)
+            H = H.toarray() if hasattr(H, 'toarray') else H
+            return np.sort(np.append(np.linalg.eigvalsh(H[1:,1:]), Wgrd))
+        extra.append(np.real(Ht[model.Icav,model.Icav]))
+
+    mol = Imol + np.arange(Nmol)
+    diag = np.real(_hermitianEntries(model, mol, mol, useHt0))
+    off = _hermitianEntries(model, mol, Imol + (np.arange(Nmol)+1)%Nmol, useHt0)
+    band, order = ringBand(diag, off)
+    if np.allclose(band.imag, 0.0):
+        band = band.real
+    return np.sort(np.concatenate((eig_banded(band, lower=True, eigvals_only=True), extra)))
+
+
+def partialSpectrum(model, k=2, useHt0=False):
+    """
+    The k extremal eigenvalues (k//2 from each end) of the Hermitian part by a sparse Lanczos
+    solver, enough to check the polaritons at production sizes. Keep k small: the band
+    edges of a long ring are clustered and converge slowly
+    """
+    from scipy.sparse.linalg import eigsh, LinearOperator
+
+    H = _hermitianOperator(model, useHt0)
+    dim = H.shape[0]
+    op = LinearOperator((dim,dim), matvec=lambda x: H.dot(x), dtype=complex)
+    lower = eigsh(op, k=k//2, which='SA', return_eigenvectors=False) if k//2 else []
+    upper = eigsh(op, k=k-k//2, which='LA', return_eigenvectors=False)
+    return np.sort(np.real(np.concatenate((lower, upper))))
+
+
+def extremal(spectrum, k=2):
+    """
+    The eigenvalues partialSpectrum returns, taken from a full sorted spectrum
+    """
+    spectrum = np.sort(spectrum)
+    return np.concatenate((spectrum[:k//2], spectrum[len(spectrum)-(k-k//2):]))
+
+
+def checkSpectrum(numerical, analytical, atol=1e-8):
+    """
+    Compare two spectra after sorting; returns (all close, largest deviation)
+    """
+    numerical, analytical = np.sort(np.real(numerical)), np.sort(np.real(analytical))
+    if len(numerical) != len(analytical):
+        return False, np.inf
+    deviation = np.abs(numerical - analytical).max()
+    return deviation <= atol, deviation
+
+
+def secularRoots(poles, weights, shift, tol=1e-14, maxiter=100, chunk=512):
+    """
+    All roots of the secular equation f(E) = E - shift - sum_k weights[k]/(E - poles[k]) = 0
+    for distinct real poles and positive weights (eigenvalues of a diagonal matrix bordered
+    by one row/column, e.g. a cavity coupled to the ring modes). There is exactly one root
+    in each interval between consecutive poles and one beyond either end; every root is
+    found by a Newton iteration on f*(E-a)*(b-E), which is smooth inside its interval (a,b),
+    safeguarded by bisection. O(N) per iteration and root
+    """
+    order = np.argsort(poles)
+    p = np.asarray(poles, dtype=float)[order]
+    w = np.asarray(weights, dtype=float)[order]
+    reach = np.sqrt(np.sum(w))
+    lo = np.concatenate(([min(p[0], shift) - reach - 1.0], p))
+    hi = np.concatenate((p, [max(p[-1], shift) + reach + 1.0]))
+    loPole = np.arange(len(lo)) > 0
+    hiPole = np.arange(len(hi)) < len(p)
+
+    roots = np.empty(len(lo))
+    for start in range(0, len(lo), chunk):
+        part = slice(start, start+chunk)
+        a, b = lo[part].copy(), hi[part].copy()
+        la, hb = loPole[part], hiPole[part]
+        A, B = np.where(la, lo[part], 0.0), np.where(hb, hi[part], 0.0)
+        E = 0.5*(a + b)
+        for _ in range(maxiter):
+            d = E[:,None] - p[None,:]
+            f = E - shift - np.sum(w/d, axis=1)
+            fp = 1.0 + np.sum(w/d**2, axis=1)
+            # f increases between its poles: the root lies right of E where f < 0
+            a = np.where(f < 0, E, a)
+            b = np.where(f < 0, b, E)
+            u = np.where(la, E - A, 1.0)
+            v = np.where(hb, B - E, 1.0)
+            F = f*u*v
+            Fp = fp*u*v + f*(np.where(la, 1.0, 0.0)*v - u*np.where(hb, 1.0, 0.0))
+            with np.errstate(divide='ignore', invalid='ignore'):
+                Enew = E - F/Fp
+            outside = ~((Enew >= a) & (Enew <= b))
+            Enew = np.where(outside, 0.5*(a + b), Enew)
+            converged = np.abs(Enew - E) <= tol*np.maximum(1.0, np.abs(E))
+            E = Enew
+            if np.all(converged):
+                break
+        roots[part] = E
+    return roots
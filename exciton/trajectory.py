@@ -1,6 +1,4 @@
-from math import gamma
 import numpy as np
-from copy import deepcopy
 class Trajectory_SSHmodel():
 
     def __init__(self,Nmol,seed=None):
@@ -123,6 +121,131 @@ class Trajectory_SSHmodel():
         R2 = np.sum((self.Rj-R)**2 *np.abs(self.Cj.T)**2)
         return R2
 
+class StateLayout():
+    """
+    Fixed layout of the single-excitation state vector
+
+        | grd | cav (optional) | mol (Nmol) | rad (Nrad, only without the Q matrix) |
+
+    with precomputed slices, so states are written into one contiguous (dim,1) buffer
+    instead of being stacked block by block
+    """
+    def __init__(self,Nmol,Nrad=0,hasCavity=False):
+        self.Nmol = Nmol
+        self.Nrad = Nrad
+        self.hasCavity = hasCavity
+
+        self.Igrd = 0
+        self.Icav = 1 if hasCavity else None
+        self.Imol = 2 if hasCavity else 1
+        self.Irad = self.Imol + Nmol
+        self.dim = self.Irad + Nrad
+
+        self.grd = slice(self.Igrd, self.Igrd+1)
+        self.cav = slice(self.Icav, self.Icav+1) if hasCavity else slice(self.Imol, self.Imol)
+        self.mol = slice(self.Imol, self.Irad)
+        self.cavmol = slice(self.Icav if hasCavity else self.Imol, self.Irad)
+        self.rad = slice(self.Irad, self.dim)
+
+    def zeros(self):
+        return np.zeros((self.dim,1),complex)
+
+    def state(self,grd=None,cav=None,mol=None,cavmol=None):
+        """
+        Assemble a state vector from its blocks; missing blocks are zero
+        """
+        Cj = self.zeros()
+        for block, value in ((self.grd,grd),(self.cav,cav),(self.mol,mol),(self.cavmol,cavmol)):
+            if value is not None:
+                Cj[block,0] = np.ravel(value)
+        return Cj
+
+    def batch(self,Nbatch):
+        return np.zeros((self.dim,Nbatch),complex)
+
+
+class InitialStates():
+    """
+    Batches of initial states as one (dim, Nbatch) array, one state per column, built with
+    broadcasting instead of site loops. The initialCj_* methods of the models use it with
+    Nbatch=1; the RK4 propagators accept the whole batch as Cj
+
+        states = InitialStates(model.layout)
+        model.Cj = states.gaussian(centers=[20,50,80], widths=3.0, momenta=[0.0,0.5,-0.5])
+    """
+    def __init__(self,layout):
+        self.layout = layout
+        self.sites = np.arange(layout.Nmol)
+
+    def _block(self,block,values):
+        values = np.asarray(values)
+        if values.ndim == 1:
+            values = values[:,None]
+        Cj = self.layout.batch(values.shape[1])
+        Cj[getattr(self.layout,block)] = values
+        return Cj
+
+    def site(self,sites):
+        """
+        Single excitations on the given molecules
+        """
+        sites = np.atleast_1d(sites)
+        Cj = self.layout.batch(len(sites))
+        Cj[self.layout.Imol+sites,np.arange(len(sites))] = 1.0
+        return Cj
+
+    def middle(self,Nbatch=1):
+        return self.site(np.full(Nbatch,int(self.layout.Nmol/2)))
+
+    def gaussian(self,centers=None,widths=2.0,momenta=0.0):
+        """
+        Gaussian packets exp(-(j-center)^2/2/width^2 + i*momentum*j)/sqrt(sqrt(pi)*width);
+        centers, widths and momenta broadcast against each other (default center: the middle)
+        """
+        if centers is None:
+            centers = int(self.layout.Nmol/2)
+        centers, widths, momenta = np.broadcast_arrays(*[np.atleast_1d(np.asarray(x,float)) for x in (centers,widths,momenta)])
+        j = self.sites[:,None]
+        Cmol = np.exp(-(j-centers)**2/2/widths**2 + 1j*momenta*j)/np.sqrt(np.sqrt(np.pi)*widths)
+        return self._block('mol',Cmol)
+
+    def randomPhase(self,Nbatch=1):
+        """
+        Uniform amplitudes 1/sqrt(Nmol) with independent random phases
+        """
+        Nmol = self.layout.Nmol
+        return self._block('mol',np.exp(1j*2*np.pi*np.random.rand(Nmol,Nbatch))/np.sqrt(Nmol))
+
+    def bright(self,Nbatch=1):
+        return self._block('mol',np.full((self.layout.Nmol,Nbatch),1.0/np.sqrt(self.layout.Nmol)))
+
+    def cavity(self,Nbatch=1):
+        if not self.layout.hasCavity:
+            raise ValueError("there is no cavity in this layout")
+        return self._block('cav',np.ones((1,Nbatch)))
+
+    def ground(self,Nbatch=1):
+        return self._block('grd',np.ones((1,Nbatch)))
+
+    def eigenstates(self,U,indices,block='mol'):
+        """
+        Columns `indices` of an eigenvector matrix U of the 'mol' or 'cavmol' block
+        """
+        return self._block(block,np.asarray(U)[:,np.atleast_1d(indices)])
+
+
+class RK4Workspace():
+    """
+    Preallocated buffers for one RK4 step of a (dim,1) state
+    """
+    def __init__(self,shape):
+        self.K1 = np.zeros(shape,complex)
+        self.K2 = np.zeros(shape,complex)
+        self.K3 = np.zeros(shape,complex)
+        self.K4 = np.zeros(shape,complex)
+        self.tmp = np.zeros(shape,complex)
+
+
 class SingleExcitationWithCollectiveCoupling():
 
     def __init__(self,Nmol,Nrad,seed=None):
@@ -181,10 +304,11 @@ class SingleExcitationWithCollectiveCoupling():
             self.Ht0 = np.vstack((  np.hstack(( Hgrd,          Vmolgrd.T*drive,    Vradgrd.T    )),
                                     np.hstack(( Vmolgrd*drive, Hmol,               Vradmol.T    )),
                                     np.hstack(( Vradgrd,       Vradmol,            Hrad         )) ))
-        self.Ht = deepcopy(self.Ht0)
+        self.Ht = self.Ht0.copy()
 
         self.Imol = 1
         self.Irad = self.Nmol+1
+        self.layout = StateLayout(self.Nmol,0 if useQmatrix else self.Nrad,hasCavity=False)
 
     def initialHamiltonian_Cavity_Radiation(self,Wgrd,Wcav,Wmol,Vndd,Vcav,Vrad,Wmax,damp,useQmatrix=False):
         """
@@ -243,11 +367,12 @@ class SingleExcitationWithCollectiveCoupling():
                                     np.hstack(( Vcavgrd,       Hcav,          Vmolcav.T,          Vradcav.T )),
                                     np.hstack(( Vmolgrd*drive, Vmolcav,       Hmol,               Vradmol.T )),
                                     np.hstack(( Vradgrd,       Vradcav,       Vradmol,            Hrad      )) ))
-        self.Ht = deepcopy(self.Ht0)
+        self.Ht = self.Ht0.copy()
         
         self.Icav = 1
         self.Imol = 2
         self.Irad = self.Nmol+2
+        self.layout = StateLayout(self.Nmol,0 if useQmatrix else self.Nrad,hasCavity=True)
 
     def initialHamiltonian_Cavity_nonHermitian(self,Wgrd,Wcav,Wmol,Vndd,Vcav,Kcav,Gamma=0.0):
         """
@@ -299,14 +424,15 @@ class SingleExcitationWithCollectiveCoupling():
         self.Jt0 = np.vstack((  np.hstack(( Hgrd*0.0,      Vcavgrd.T*0.0,   Vmolgrd.T*0.0   )),
                                 np.hstack(( Vcavgrd*0.0,   Hcav*0.0,        Vmolcav.T*0.0   )),
                                 np.hstack(( Vmolgrd*0.0,   Vmolcav*0.0,     Jmol )) ))
-        self.Jt = deepcopy(self.Jt0)
+        self.Jt = self.Jt0.copy()
 
-        self.Ht = deepcopy(self.Ht0)        
+        self.Ht = self.Ht0.copy()        
         self.Icav = 1
         self.Imol = 2
+        self.layout = StateLayout(self.Nmol,0,hasCavity=True)
 
     def updateDiagonalStaticDisorder(self,Delta):
-        self.Ht = deepcopy(self.Ht0)
+        self.Ht = self.Ht0.copy()
 
         self.Wstc = np.random.normal(0.0,Delta,self.Nmol) + self.Wmol
         for j in range(self.Nmol): 
@@ -316,7 +442,7 @@ class SingleExcitationWithCollectiveCoupling():
         # simulate Gaussian process
         # cf. George B. Rybicki's note
         # https://www.lanl.gov/DLDSTP/fast/OU_process.pdf
-        self.Ht = deepcopy(self.Ht0)
+        self.Ht = self.Ht0.copy()
 
         if not hasattr(self, 'Wdyn'):
             self.Wdyn = np.random.normal(0.0,Delta,self.Nmol) + self.Wmol
@@ -330,7 +456,7 @@ class SingleExcitationWithCollectiveCoupling():
             self.Ht[self.Imol+j,self.Imol+j] += self.Wdyn[j]
 
     def updateNeighborStaticDisorder(self,Delta):
-        self.Ht = deepcopy(self.Ht0)
+        self.Ht = self.Ht0.copy()
 
         if not hasattr(self, 'Vstc'):
             self.Vstc = np.random.normal(0.0,Delta,self.Nmol)
@@ -346,7 +472,7 @@ class SingleExcitationWithCollectiveCoupling():
         # simulate Gaussian process
         # cf. George B. Rybicki's note
         # https://www.lanl.gov/DLDSTP/fast/OU_process.pdf
-        self.Ht = deepcopy(self.Ht0)
+        self.Ht = self.Ht0.copy()
 
         # if not hasattr(self, 'Vdyn'):
         #     self.Vdyn = np.random.normal(0.0,Delta,self.Nmol)
@@ -379,7 +505,7 @@ class SingleExcitationWithCollectiveCoupling():
         self.Ht[self.Imol+self.Nmol-1,self.Imol] += Delta*(self.Xdyn[0]-self.Xdyn[-1])
 
     def updateNeighborHarmonicOscillator(self,staticCoup,dynamicCoup):
-        self.Ht = deepcopy(self.Ht0)
+        self.Ht = self.Ht0.copy()
 
         if not hasattr(self, 'dHdt'):
             self.dHdt = np.zeros_like(self.Ht0)
@@ -398,96 +524,37 @@ class SingleExcitationWithCollectiveCoupling():
         self.dHdt[self.Imol,self.Imol+self.Nmol-1] = self.dynamicCoup * (self.Vj[0]-self.Vj[-1])
         self.dHdt[self.Imol+self.Nmol-1,self.Imol] = self.dynamicCoup * (self.Vj[0]-self.Vj[-1])
 
+    @property
+    def initialStates(self):
+        return InitialStates(self.layout)
+
     def initialCj_Cavity(self):
-        self.Cj = np.zeros((self.Nmol,1),complex)
-        if hasattr(self, 'Icav'):
-            self.Cj = np.vstack( (np.zeros((1,1),complex),    #grd
-                                    np.ones((1,1),complex),  #cav
-                                    self.Cj) )                #mol
-        else:
+        if not hasattr(self, 'Icav'):
             print("cannot initial Cj in the cavity state when there is no cavity")
             exit()
-        if not self.useQmatrix:
-            self.Cj = np.vstack( (self.Cj,np.zeros((self.Nrad,1),complex)) )
+        self.Cj = self.initialStates.cavity()
 
     def initialCj_Bright(self):
-        self.Cj = np.ones((self.Nmol,1),complex)/np.sqrt(self.Nmol)
-        if hasattr(self, 'Icav'):
-            self.Cj = np.vstack( (np.zeros((1,1),complex),    #grd
-                                    np.zeros((1,1),complex),  #cav
-                                    self.Cj) )                #mol
-        else:
-            self.Cj = np.vstack( (np.zeros((1,1),complex),    #grd
-                                    self.Cj) )                #mol
-        if not self.useQmatrix:
-            self.Cj = np.vstack( (self.Cj,np.zeros((self.Nrad,1),complex)) )
+        self.Cj = self.initialStates.bright()
 
     def initialCj_Ground(self):
-        self.Cj = np.zeros((self.Nmol,1),complex)
-        if hasattr(self, 'Icav'):
-            self.Cj = np.vstack( (np.ones((1,1),complex),   #grd
-                                    np.zeros((1,1),complex),  #cav
-                                    self.Cj) )                #mol
-        else:  
-            self.Cj = np.vstack( (np.ones((1,1),complex),   #grd
-                                    self.Cj) )                #mol          
-        if not self.useQmatrix:
-            self.Cj = np.vstack( (self.Cj,np.zeros((self.Nrad,1),complex)) )
+        self.Cj = self.initialStates.ground()
 
     def initialCj_Random(self):      
-        self.Cj = np.ones((self.Nmol,1),complex)/np.sqrt(self.Nmol)*np.exp(1j*2*np.pi*np.random.rand(self.Nmol,1))
-        if hasattr(self, 'Icav'):
-            self.Cj = np.vstack( (np.zeros((1,1),complex),  #grd
-                                    np.zeros((1,1),complex),  #cav 
-                                    self.Cj) )                #mol
-        else:
-            self.Cj = np.vstack( (np.zeros((1,1),complex),  #grd
-                                    self.Cj) )                #mol
-        if not self.useQmatrix:
-            self.Cj = np.vstack( (self.Cj,np.zeros((self.Nrad,1),complex)) )
+        self.Cj = self.initialStates.randomPhase()
 
     def initialCj_middle(self):
         """
         choose the initial Cj as a single exictation at the middle of the chain
         """
-        self.Cj = np.zeros((self.Nmol,1),complex)
-        self.Cj[int(self.Nmol/2)] = 1.0
-        # j0 = int(self.Nmol/2)
-        # width = 1
-        # for j in range(self.Nmol):
-        #     self.Cj[j,0] = np.exp(-(j-j0)**2/width**2/2)            
-        # self.Cj = self.Cj/np.sqrt(np.sum(np.abs(self.Cj)**2))
-        
-        if hasattr(self, 'Icav'):
-            self.Cj = np.vstack( (np.zeros((1,1),complex),    #grd
-                                    np.zeros((1,1),complex),  #cav
-                                    self.Cj) )                #mol
-        else:
-            self.Cj = np.vstack( (np.zeros((1,1),complex),    #grd
-                                    self.Cj) )                #mol
-        if not self.useQmatrix:
-            self.Cj = np.vstack( (self.Cj,np.zeros((self.Nrad,1),complex)) )
+        self.Cj = self.initialStates.middle()
 
-    def initialCj_Gaussian(self,width):
+    def initialCj_Gaussian(self,width,k0=0.0,center=None):
         """
         Initialize Cj as a Gaussian distribution centered at the middle of the chain
+        (or at center), with an optional initial momentum k0
         """
-        self.Cj = np.zeros((self.Nmol,1),complex)
-        middle = int(self.Nmol/2)
-        for j in range(self.Nmol):
-            self.Cj[j] = np.exp(-(j-middle)**2/2/width**2)/np.sqrt(np.sqrt(np.pi)*width)
-            # self.Cj[j] = np.exp(-(j-middle)**2/2/width**2)/np.sqrt(np.sqrt(np.pi)*width) * np.exp(1j*1.0*j) #WITH AN INITIAL MOMENTUM
-        print(np.linalg.norm(self.Cj)**2)
-
-        if hasattr(self, 'Icav'):
-            self.Cj = np.vstack( (np.zeros((1,1),complex),    #grd
-                                    np.zeros((1,1),complex),  #cav
-                                    self.Cj) )                #mol
-        else:
-            self.Cj = np.vstack( (np.zeros((1,1),complex),    #grd
-                                    self.Cj) )                #mol
-        if not self.useQmatrix:
-            self.Cj = np.vstack( (self.Cj,np.zeros((self.Nrad,1),complex)) )
+        self.Cj = self.initialStates.gaussian(center,width,k0)
 
     def initialCj_Eigenstate_Forward(self,Wmol,Vndd,initial_state=0):
         """
@@ -506,17 +573,7 @@ class SingleExcitationWithCollectiveCoupling():
         U = U[:,idx]
 
         # Initialize state vector
-        self.Cj = U.T[initial_state]
-        self.Cj = self.Cj[..., None] 
-        if hasattr(self, 'Icav'):
-            self.Cj = np.vstack( (np.zeros((1,1),complex),  #grd
-                                  np.zeros((1,1),complex),  #cav
-                                  self.Cj) )                #mol
-        else:
-            self.Cj = np.vstack( (np.zeros((1,1),complex),  #grd
-                                  self.Cj) )                #mol
-        if not self.useQmatrix:
-            self.Cj = np.vstack( (self.Cj,np.zeros((self.Nrad,1),complex)) )
+        self.Cj = self.initialStates.eigenstates(U,initial_state,'mol')
 
         return W
 
@@ -534,17 +591,7 @@ class SingleExcitationWithCollectiveCoupling():
         U = U[:,idx]
 
         # Initialize state vector
-        self.Cj = U.T[initial_state]
-        self.Cj = self.Cj[..., None] 
-        if hasattr(self, 'Icav'):
-            self.Cj = np.vstack( (np.zeros((1,1),complex),  #grd
-                                  np.zeros((1,1),complex),  #cav
-                                  self.Cj) )                #mol
-        else:
-            self.Cj = np.vstack( (np.zeros((1,1),complex),  #grd
-                                  self.Cj) )                #mol
-        if not self.useQmatrix:
-            self.Cj = np.vstack( (self.Cj,np.zeros((self.Nrad,1),complex)) )
+        self.Cj = self.initialStates.eigenstates(U,initial_state,'mol')
 
         return W, U
 
@@ -563,13 +610,7 @@ class SingleExcitationWithCollectiveCoupling():
         U = U[:,idx]
         
         # Initialize state vector
-        self.Cj = U.T[initial_state]
-        self.Cj = self.Cj[..., None] 
-
-        self.Cj = np.vstack( (np.zeros((1,1),complex),  #grd
-                              self.Cj) )                #mol
-        if not self.useQmatrix:
-            self.Cj = np.vstack( (self.Cj,np.zeros((self.Nrad,1),complex)) )
+        self.Cj = self.initialStates.eigenstates(U,initial_state,'cavmol')
 
         return W, U
 
@@ -604,17 +645,7 @@ class SingleExcitationWithCollectiveCoupling():
         self.Prob = self.Prob[initial_state]
 
         # Initialize state vector
-        self.Cj = U.T[initial_state]
-        self.Cj = self.Cj[..., None] 
-        if hasattr(self, 'Icav'):
-            self.Cj = np.vstack( (np.zeros((1,1),complex),  #grd
-                                  np.zeros((1,1),complex),  #cav
-                                  self.Cj) )                #mol
-        else:
-            self.Cj = np.vstack( (np.zeros((1,1),complex),  #grd
-                                  self.Cj) )                #mol
-        if not self.useQmatrix:
-            self.Cj = np.vstack( (self.Cj,np.zeros((self.Nrad,1),complex)) )
+        self.Cj = self.initialStates.eigenstates(U,initial_state,'mol')
 
     def initialCj_Polariton(self,initial_state):
         """
@@ -630,21 +661,55 @@ class SingleExcitationWithCollectiveCoupling():
         U = U[:,idx]
         
         # Initialize state vector
-        self.Cj = U.T[initial_state]
-        self.Cj = self.Cj[..., None] 
+        self.Cj = self.initialStates.eigenstates(U,initial_state,'cavmol')
 
-        self.Cj = np.vstack( (np.zeros((1,1),complex),  #grd
-                              self.Cj) )                #mol
-        if not self.useQmatrix:
-            self.Cj = np.vstack( (self.Cj,np.zeros((self.Nrad,1),complex)) )
+    def applyHt(self,C,out=None):
+        """
+        Ht*C, written into out when given
+        """
+        return np.dot(self.Ht,C,out=out)
+
+    def _workspace(self,name,shape):
+        """
+        RK4 buffers are kept per propagated vector and reused while its shape is unchanged
+        """
+        if not hasattr(self, '_workspaces'):
+            self._workspaces = {}
+        ws = self._workspaces.get(name)
+        if ws is None or ws.K1.shape != shape:
+            ws = RK4Workspace(shape)
+            self._workspaces[name] = ws
+        return ws
+
+    def _stepRK4(self,C,dt,ws):
+        """
+        One RK4 step of dC/dt = -i*Ht*C in place, using only the buffers of ws
+        """
+        K1, K2, K3, K4, tmp = ws.K1, ws.K2, ws.K3, ws.K4, ws.tmp
+        self.applyHt(C,out=K1)
+        K1 *= -1j
+        np.multiply(K1,dt/2,out=tmp); tmp += C
+        self.applyHt(tmp,out=K2)
+        K2 *= -1j
+        np.multiply(K2,dt/2,out=tmp); tmp += C
+        self.applyHt(tmp,out=K3)
+        K3 *= -1j
+        np.multiply(K3,dt,out=tmp); tmp += C
+        self.applyHt(tmp,out=K4)
+        K4 *= -1j
+        # C += (K1+2*K2+2*K3+K4)*dt/6, in the same order of operations
+        K2 *= 2
+        K1 += K2
+        K3 *= 2
+        K1 += K3
+        K1 += K4
+        K1 *= dt
+        K1 /= 6
+        C += K1
 
     def propagateCj_RK4(self,dt):
         ### RK4 propagation 
-        K1 = -1j*np.dot(self.Ht,self.Cj)
-        K2 = -1j*np.dot(self.Ht,self.Cj+dt*K1/2)
-        K3 = -1j*np.dot(self.Ht,self.Cj+dt*K2/2)
-        K4 = -1j*np.dot(self.Ht,self.Cj+dt*K3)
-        self.Cj += (K1+2*K2+2*K3+K4)*dt/6
+        self._stepRK4(self.Cj,dt,self._workspace('Cj',self.Cj.shape))
 
     def propagateCj_dHdt(self,dt):
         if not hasattr(self, 'dHdt'):
@@ -717,19 +782,22 @@ class SingleExcitationWithCollectiveCoupling():
 
     def getCurrentCorrelation(self):
         if hasattr(self, 'J0Cj'):
-            # self.Jt = deepcopy(self.Ht)
+            # self.Jt = self.Ht.copy()
+            # the couplings without the -i*Gamma/2 damping of Qmat (uniform on the molecular
+            # block), the same current as Jt0 and as the sparse backend
+            damp = self.Qmat[self.Imol,self.Imol] if hasattr(self, 'Qmat') else 0.0
             self.Jt = np.zeros_like(self.Ht)
             for j in range(self.Nmol-1): 
-                self.Jt[self.Imol+j,   self.Imol+j+1] = self.Ht[self.Imol+j,   self.Imol+j+1]*1j
-                self.Jt[self.Imol+j+1, self.Imol+j]   =-self.Ht[self.Imol+j+1, self.Imol+j]*1j   
+                self.Jt[self.Imol+j,   self.Imol+j+1] = (self.Ht[self.Imol+j,   self.Imol+j+1]-damp)*1j
+                self.Jt[self.Imol+j+1, self.Imol+j]   =-(self.Ht[self.Imol+j+1, self.Imol+j]-damp)*1j   
             
-            self.Jt[self.Imol,self.Imol+self.Nmol-1] =-self.Ht[self.Imol,self.Imol+self.Nmol-1]*1j
-            self.Jt[self.Imol+self.Nmol-1,self.Imol] = self.Ht[self.Imol+self.Nmol-1,self.Imol]*1j 
+            self.Jt[self.Imol,self.Imol+self.Nmol-1] =-(self.Ht[self.Imol,self.Imol+self.Nmol-1]-damp)*1j
+            self.Jt[self.Imol+self.Nmol-1,self.Imol] = (self.Ht[self.Imol+self.Nmol-1,self.Imol]-damp)*1j 
             # Here Cj is at time t
             # self.JtCj = np.dot(self.Jt,self.Cj)
         else: #first step only 
             self.J0Cj = np.dot(self.Jt0,self.Cj)
-            self.Jt = deepcopy(self.Jt0)
+            self.Jt = self.Jt0.copy()
 
         CJJ = np.dot(np.conj(self.Cj).T,np.dot(self.Jt,self.J0Cj))
         Javg = np.dot(np.conj(self.Cj).T,np.dot(self.Jt,self.Cj))
@@ -737,8 +805,4 @@ class SingleExcitationWithCollectiveCoupling():
 
     def propagateJ0Cj_RK4(self,dt):
         ### RK4 propagation 
-        K1 = -1j*np.dot(self.Ht,self.J0Cj)
-        K2 = -1j*np.dot(self.Ht,self.J0Cj+dt*K1/2)
-        K3 = -1j*np.dot(self.Ht,self.J0Cj+dt*K2/2)
-        K4 = -1j*np.dot(self.Ht,self.J0Cj+dt*K3)
-        self.J0Cj += (K1+2*K2+2*K3+K4)*dt/6
+        self._stepRK4(self.J0Cj,dt,self._workspace('J0Cj',self.J0Cj.shape))
@@ -0,0 +1,203 @@
+import numpy as np
+
+
+class MovingWindowSingleExcitation():
+    """
+    Clean ring with a cavity (Kcav=0) propagated only on an active window of sites.
+
+    Outside the window every molecule carries the same background amplitude a(t): on a
+    clean ring the uniform vector is the bright mode, so the cavity feeds it exactly and
+    i da/dt = (Wmol+2*Vndd)*a + Vcav*c_cav - i*Gamma/2*S,  S = sum of all molecular amplitudes.
+    The window holds the full amplitudes of the sites where the packet deviates from a.
+    After every step the deviation at the window edges is checked and the window grows
+    by `margin` sites on a side where it exceeds `tol`. Once it would cover the ring,
+    the whole ring is propagated with periodic boundaries, so the result stays exact.
+
+    The interface follows SingleExcitationWithCollectiveCoupling so the runner can use it
+    with backend='window' (no disorder, no current correlation).
+    """
+
+    def __init__(self,Nmol,Nrad=0,seed=None,tol=1e-12,margin=16):
+        self.Nmol = Nmol
+        self.Nrad = Nrad
+        self.tol = tol
+        self.margin = margin
+        self.useQmatrix = True
+        np.random.seed(seed)
+
+    def initialHamiltonian_Cavity_nonHermitian(self,Wgrd,Wcav,Wmol,Vndd,Vcav,Kcav,Gamma=0.0):
+        if not Kcav==0:
+            raise ValueError("the moving window needs a uniform cavity coupling (Kcav=0)")
+        self.Wgrd = Wgrd
+        self.Wcav = Wcav
+        self.Wmol = Wmol
+        self.Vndd = Vndd
+        self.Vcav = Vcav
+        self.Gamma = Gamma
+        self.Icav = 1
+        self.Imol = 2
+
+    def _noDisorder(self,*args,**kwargs):
+        raise ValueError("the moving window assumes a clean ring outside the window")
+
+    updateDiagonalStaticDisorder = _noDisorder
+    updateDiagonalDynamicDisorder = _noDisorder
+    updateNeighborStaticDisorder = _noDisorder
+    updateNeighborDynamicDisorder = _noDisorder
+
+    def getCurrentCorrelation(self):
+        raise ValueError("use computeCorrelation=False with the moving window")
+
+    ### state: y = [grd, cav, a, window...], window site k is (lo+k) mod Nmol
+
+    def _setState(self,grd,cav,background,Cmol):
+        """
+        Choose the window around the support of |Cmol - background|^2 plus the margin
+        """
+        Cmol = np.asarray(Cmol,complex).ravel()
+        support = np.nonzero(np.abs(Cmol-background)**2 > self.tol)[0]
+        if len(support) == 0:
+            support = np.array([self.Nmol//2])
+        lo = support[0] - self.margin
+        hi = support[-1] + 1 + self.margin
+        if hi - lo >= self.Nmol:
+            lo, hi = 0, self.Nmol
+        self.lo = lo
+        sites = np.arange(lo,hi) % self.Nmol
+        self.y = np.concatenate(([grd, cav, background], Cmol[sites])).astype(complex)
+
+    @property
+    def L(self):
+        return len(self.y) - 3
+
+    @property
+    def sites(self):
+        return (self.lo + np.arange(self.L)) % self.Nmol
+
+    def initialCj_middle(self):
+        Cmol = np.zeros(self.Nmol,complex)
+        Cmol[int(self.Nmol/2)] = 1.0
+        self._setState(0.0,0.0,0.0,Cmol)
+
+    def initialCj_Gaussian(self,width,k0=0.0,center=None):
+        j = np.arange(self.Nmol)
+        center = int(self.Nmol/2) if center is None else center
+        Cmol = np.exp(-(j-center)**2/2/width**2)/np.sqrt(np.sqrt(np.pi)*width)*np.exp(1j*k0*j)
+        self._setState(0.0,0.0,0.0,Cmol)
+
+    def initialCj_Bright(self):
+        self.lo = int(self.Nmol/2)
+        self.y = np.array([0.0, 0.0, 1.0/np.sqrt(self.Nmol)],complex)
+
+    def initialCj_Cavity(self):
+        self.lo = int(self.Nmol/2)
+        self.y = np.array([0.0, 1.0, 0.0],complex)
+
+    def initialCj_Ground(self):
+        self.lo = int(self.Nmol/2)
+        self.y = np.array([1.0, 0.0, 0.0],complex)
+
+    ### propagation
+
+    def _deriv(self,y):
+        grd, cav, a, w = y[0], y[1], y[2], y[3:]
+        L = len(w)
+        full = L == self.Nmol
+        nout = self.Nmol - L
+        S = np.sum(w) + a*nout
+        f = self.Vcav*cav - 1j*(self.Gamma/2)*S
+
+        dy = np.empty_like(y)
+        dy[0] = -1j*self.Wgrd*grd
+        dy[1] = -1j*(self.Wcav*cav + np.conj(self.Vcav)*S)
+        dy[2] = 0.0 if full else -1j*((self.Wmol+2.0*self.Vndd)*a + f)
+        if L:
+            left = w[-1] if full else a
+            right = w[0] if full else a
+            neighbors = np.empty_like(w)
+            neighbors[1:] = w[:-1]
+            neighbors[0] = left
+            neighbors[:-1] += w[1:]
+            neighbors[-1] += right
+            dy[3:] = -1j*(self.Wmol*w + self.Vndd*neighbors + f)
+        return dy
+
+    def _grow(self):
+        """
+        Extend the window where the packet reaches its edges
+        """
+        L = self.L
+        if L == self.Nmol:
+            return
+        a = self.y[2]
+        w = self.y[3:]
+        edge = max(self.margin//2, 1)
+        if L == 0:
+            growLeft = growRight = False
+        else:
+            growLeft = np.max(np.abs(w[:edge]-a)**2) > self.tol
+            growRight = np.max(np.abs(w[-edge:]-a)**2) > self.tol
+        if not (growLeft or growRight):
+            return
+        nleft = self.margin if growLeft else 0
+        nright = self.margin if growRight else 0
+        if L + nleft + nright >= self.Nmol:
+            nleft, nright = 0, self.Nmol - L
+        self.lo -= nleft
+        self.y = np.concatenate((self.y[:3], np.full(nleft,a), w, np.full(nright,a)))
+
+    def propagateCj_RK4(self,dt):
+        ### RK4 propagation
+        y = self.y
+        K1 = self._deriv(y)
+        K2 = self._deriv(y+dt*K1/2)
+        K3 = self._deriv(y+dt*K2/2)
+        K4 = self._deriv(y+dt*K3)
+        self.y = y + (K1+2*K2+2*K3+K4)*dt/6
+        self._grow()
+
+    ### observables
+
+    def getMolecularAmplitudes(self):
+        Cmol = np.full(self.Nmol,self.y[2],complex)
+        Cmol[self.sites] = self.y[3:]
+        return Cmol
+
+    @property
+    def Cj(self):
+        """
+        Full state vector in the grd|cav|mol layout, assembled on demand
+        """
+        return np.concatenate((self.y[:2], self.getMolecularAmplitudes()))[:,None]
+
+    def _moments(self):
+        """
+        sum P_j, sum j*P_j, sum j^2*P_j over the ring with P_j = |c_j|^2,
+        the background contributing through closed-form sums over the outside sites
+        """
+        N = self.Nmol
+        Pa = np.abs(self.y[2])**2
+        Pw = np.abs(self.y[3:])**2
+        j = self.sites.astype(float)
+        sum0 = N - self.L
+        sum1 = N*(N-1)/2 - np.sum(j)
+        sum2 = (N-1)*N*(2*N-1)/6 - np.sum(j**2)
+        return (np.sum(Pw) + Pa*sum0, np.sum(j*Pw) + Pa*sum1, np.sum(j**2*Pw) + Pa*sum2)
+
+    def getPopulation_system(self):
+        return self._moments()[0]
+
+    def getPopulation_cavity(self):
+        return np.abs(self.y[1])**2
+
+    def getPopulation_radiation(self):
+        return 0.0
+
+    def getIPR(self):
+        P0 = self._moments()[0]
+        return P0**2 / (np.sum(np.abs(self.y[3:])**4) + (self.Nmol-self.L)*np.abs(self.y[2])**4)
+
+    def getDisplacement(self):
+        M0, M1, M2 = self._moments()
+        R = np.abs(M1)
+        return np.abs(M2 - 2*R*M1 + R**2*M0)
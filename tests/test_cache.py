@@ -0,0 +1,44 @@
+import numpy as np
+import pytest
+
+from exciton.cache import DiskCache
+from exciton.runner import SimulationConfig, Simulation, ObservableRecorder
+
+
+OBSERVABLES = ('Pmol', 'IPR', 'Displacement_list', 'Correlation_list', 'Current_list')
+
+
+def run(**kwargs):
+    config = SimulationConfig(Nmol=21, Ntimes=300, Nskip=20, Vcav=0.05, Kcav=2, Gamma=0.02, seed=5,
+                              initialState='random', **kwargs)
+    return Simulation(config, [ObservableRecorder()]).run()[0]
+
+
+@pytest.mark.parametrize('options', [
+    {'useStaticDiagonalDisorder': True, 'DeltaDD': 0.1, 'useStaticNeighborDisorder': True, 'DeltaNN': 0.05},
+    {'useDynamicDiagonalDisorder': True, 'DeltaDD': 0.1, 'TauDD': 0.5},
+    {'useStaticDiagonalDisorder': True, 'DeltaDD': 0.1, 'propagator': 'exact'},
+    {'useStaticDiagonalDisorder': True, 'DeltaDD': 0.1, 'correlationMethod': 'spectral'},
+    {'propagator': 'exact', 'correlationMethod': 'spectral'},
+])
+def test_cached_matches_uncached(tmp_path, options):
+    reference = run(**options)
+    for attempt in ('miss', 'hit'):
+        cached = run(cacheDir=str(tmp_path), **options)
+        for name in OBSERVABLES:
+            assert np.array_equal(getattr(cached, name), getattr(reference, name)), (attempt, name)
+
+
+def test_dt_sweep_reuses_model_and_eigenbasis(tmp_path):
+    cache = DiskCache(str(tmp_path))
+    for dt in (0.001, 0.002, 0.004):
+        run(dt=dt, cacheDir=str(tmp_path), useStaticDiagonalDisorder=True, DeltaDD=0.1,
+            propagator='exact', correlationMethod='spectral')
+    # one model, one eigendecomposition, and U(dt), U(Nskip*dt) per dt
+    assert len(cache.entries()) == 2 + 2*3
+
+
+def test_oversized_entry_is_returned(tmp_path):
+    cache = DiskCache(str(tmp_path), maxBytes=10)
+    arrays = cache.getOrCompute('x', {'a': 1}, lambda: {'A': np.arange(100.0)})
+    assert np.array_equal(arrays['A'], np.arange(100.0))
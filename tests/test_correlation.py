@@ -0,0 +1,44 @@
+import numpy as np
+import pytest
+
+from exciton.correlation import CurrentCorrelation, modelCurrentOperator
+from exciton.runner import SimulationConfig, Simulation, ObservableRecorder, buildModel
+
+linalg = pytest.importorskip('scipy.linalg')
+
+
+@pytest.mark.parametrize('Gamma', (0.0, 0.04))
+def test_correlation_matches_expm(Gamma):
+    config = SimulationConfig(Nmol=21, Vcav=0.05, Kcav=2, Gamma=Gamma, seed=3,
+                              useStaticDiagonalDisorder=True, DeltaDD=0.1)
+    model = buildModel(config)
+    H, J, psi0 = np.array(model.Ht), modelCurrentOperator(model), model.Cj[:,0].copy()
+    engine = CurrentCorrelation.fromModel(model)
+    assert engine.hermitian == (Gamma == 0.0)
+
+    U = lambda t: linalg.expm(-1j*H*t)
+    lags, origins = np.array([0.0, 0.3, 1.7, 4.0]), np.array([0.0, 0.5, 2.5])
+    CJJ = engine.correlation(psi0, lags, origins)
+    for i, s in enumerate(origins):
+        for j, t in enumerate(lags):
+            reference = np.vdot(U(s+t) @ psi0, J @ (U(t) @ (J @ (U(s) @ psi0))))
+            assert abs(CJJ[i,j] - reference) < 1e-13
+
+    current = engine.current(psi0, lags)
+    reference = [np.vdot(U(t) @ psi0, J @ (U(t) @ psi0)) for t in lags]
+    assert np.max(np.abs(current - reference)) < 1e-13
+
+    c = engine.coefficients(psi0)
+    assert np.array_equal(engine.correlation(None, lags, origins, c=c), CJJ)
+
+
+@pytest.mark.parametrize('Gamma', (0.0, 0.04))
+def test_spectral_matches_propagated(Gamma):
+    results = []
+    for method in ('propagate', 'spectral'):
+        config = SimulationConfig(Nmol=21, Ntimes=600, Nskip=50, Vcav=0.05, Kcav=2, Gamma=Gamma, seed=3,
+                                  useStaticDiagonalDisorder=True, DeltaDD=0.1, correlationMethod=method)
+        results.append(Simulation(config, [ObservableRecorder()]).run()[0])
+    propagated, spectral = results
+    assert np.max(np.abs(np.array(spectral.Correlation_list) - propagated.Correlation_list)) < 1e-10
+    assert np.max(np.abs(np.array(spectral.Current_list) - propagated.Current_list)) < 1e-10
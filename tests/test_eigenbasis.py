@@ -0,0 +1,36 @@
+import numpy as np
+import pytest
+
+from exciton.runner import SimulationConfig, Simulation, ObservableRecorder
+
+
+def run(**kwargs):
+    config = SimulationConfig(Nmol=31, Ntimes=600, Nskip=30, Vcav=0.05, Kcav=2, seed=9,
+                              useStaticDiagonalDisorder=True, DeltaDD=0.1,
+                              useStaticNeighborDisorder=True, DeltaNN=0.05,
+                              correlationMethod='spectral', **kwargs)
+    sim = Simulation(config, [ObservableRecorder()])
+    return sim.run()[0], sim.model
+
+
+@pytest.mark.parametrize('Gamma', (0.0, 0.05))
+@pytest.mark.parametrize('initialState', ('middle', 'cavity', 'random'))
+def test_eigenbasis_matches_rk4(Gamma, initialState):
+    reference, referenceModel = run(Gamma=Gamma, initialState=initialState)
+    eigen, eigenModel = run(Gamma=Gamma, initialState=initialState, backend='eigenbasis', propagator='eigenbasis')
+    assert eigen.times == reference.times
+    # RK4 with dt=0.001 against exact phases
+    for name in ('Pmol', 'IPR', 'Displacement_list', 'Correlation_list', 'Current_list'):
+        assert np.max(np.abs(np.array(getattr(eigen, name)) - getattr(reference, name))) < 1e-11, name
+    assert np.max(np.abs(eigenModel.Cj - referenceModel.Cj)) < 1e-12
+
+
+@pytest.mark.parametrize('kwargs', [
+    {'propagator': 'RK4', 'correlationMethod': 'spectral'},
+    {'propagator': 'exact', 'correlationMethod': 'spectral'},
+    {'propagator': 'eigenbasis', 'correlationMethod': 'propagate'},
+    {'propagator': 'eigenbasis', 'correlationMethod': 'spectral', 'useDynamicDiagonalDisorder': True, 'TauDD': 1.0},
+])
+def test_eigenbasis_rejects_unsupported(kwargs):
+    with pytest.raises(ValueError):
+        Simulation(SimulationConfig(Nmol=11, backend='eigenbasis', **kwargs))
@@ -0,0 +1,60 @@
+import os
+import subprocess
+import sys
+import textwrap
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pytest
+
+from exciton.ensemble import runEnsemble, runSharedEnsemble
+from exciton.runner import SimulationConfig
+
+
+def config():
+    return SimulationConfig(Nmol=21, Ntimes=200, Nskip=20, Vcav=0.05, Gamma=0.02,
+                            useStaticDiagonalDisorder=True, DeltaDD=0.1)
+
+
+def assertSameStatistics(stats, reference):
+    assert stats.count == reference.count
+    assert np.array_equal(stats.times, reference.times)
+    for name, acc in reference.stats.items():
+        assert np.allclose(stats.stats[name].mean, acc.mean, rtol=1e-12, atol=1e-15), name
+        assert np.allclose(stats.stats[name].variance(), acc.variance(), rtol=1e-10, atol=1e-15), name
+
+
+@pytest.mark.parametrize('chunk', (1, 3, 1024))
+def test_shared_reduction_matches_sequential(chunk):
+    reference = runEnsemble(config(), 7)
+    assertSameStatistics(runSharedEnsemble(config(), 7, chunk=chunk), reference)
+
+
+def test_memmap_reduction_matches_sequential(tmp_path):
+    reference = runEnsemble(config(), 5)
+    assertSameStatistics(runSharedEnsemble(config(), 5, path=str(tmp_path/'ensemble.bin')), reference)
+
+
+def test_process_pool_matches_sequential():
+    reference = runEnsemble(config(), 6)
+    with ProcessPoolExecutor(2) as executor:
+        assertSameStatistics(runEnsemble(config(), 6, executor=executor, batch=2), reference)
+        assertSameStatistics(runSharedEnsemble(config(), 6, executor=executor, batch=3), reference)
+
+
+def test_no_resource_tracker_warnings():
+    # workers started before the shared block exists have their own resource tracker
+    script = textwrap.dedent('''
+        from concurrent.futures import ProcessPoolExecutor
+        from exciton.ensemble import runEnsemble, runSharedEnsemble
+        from exciton.runner import SimulationConfig
+        if __name__ == '__main__':
+            config = SimulationConfig(Nmol=11, Ntimes=50, Nskip=10)
+            with ProcessPoolExecutor(2) as executor:
+                runEnsemble(config, 2, executor=executor)
+                runSharedEnsemble(config, 4, executor=executor)
+    ''')
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    result = subprocess.run([sys.executable, '-c', script], capture_output=True, text=True, cwd=root)
+    assert result.returncode == 0, result.stderr
+    assert 'resource_tracker' not in result.stderr
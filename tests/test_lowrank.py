@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+
+from exciton.lowrank import RingRankOneSolver
+from exciton.runner import SimulationConfig, buildModel
+
+
+CASES = [(Kcav, Gamma) for Kcav in (0, 2, 3) for Gamma in (0.0, 0.05)]
+
+
+def denseReference(Nmol, Kcav, Gamma):
+    config = SimulationConfig(Nmol=Nmol, Vcav=0.05, Kcav=Kcav, Gamma=Gamma, seed=1,
+                              initialState='gaussian', initialStateArgs={'width': 2.0, 'k0': 0.4})
+    model = buildModel(config)
+    return config, np.array(model.Ht), model.Cj[:,0].copy()
+
+
+def matchDistance(A, B):
+    """
+    Largest distance from any value of A to the nearest value of B and vice versa
+    """
+    D = np.abs(A[:,None] - B[None,:])
+    return max(np.max(np.min(D, axis=1)), np.max(np.min(D, axis=0)))
+
+
+@pytest.mark.parametrize('Nmol', (30, 31))
+@pytest.mark.parametrize('Kcav,Gamma', CASES)
+def test_eigenvalues(Nmol, Kcav, Gamma):
+    config, H, _ = denseReference(Nmol, Kcav, Gamma)
+    solver = RingRankOneSolver.fromConfig(config)
+    E = solver.eigenvalues()
+    assert len(E) == len(H)
+    assert matchDistance(E, np.linalg.eigvals(H)) < 1e-12
+
+
+@pytest.mark.parametrize('Kcav,Gamma', CASES)
+def test_propagate(Kcav, Gamma):
+    config, H, C0 = denseReference(30, Kcav, Gamma)
+    solver = RingRankOneSolver.fromConfig(config)
+    times = np.array([0.0, 0.7, 5.0, 20.0])
+    E, V = np.linalg.eig(H)
+    c = np.linalg.solve(V, C0)
+    reference = V @ (c[:,None]*np.exp(-1j*np.outer(E, times)))
+    assert np.max(np.abs(solver.propagate(C0, times) - reference)) < 1e-12
+
+
+@pytest.mark.parametrize('Kcav,Gamma', CASES)
+def test_resolvent(Kcav, Gamma):
+    config, H, C0 = denseReference(30, Kcav, Gamma)
+    solver = RingRankOneSolver.fromConfig(config)
+    for z in (-0.4+0.01j, 0.3+0.2j, 1.5-0.1j):
+        reference = np.linalg.solve(z*np.eye(len(H)) - H, C0)
+        assert np.max(np.abs(solver.resolvent(z, C0) - reference)) < 1e-12
+
+
+def test_disorder_is_rejected():
+    config = SimulationConfig(Nmol=10, useStaticDiagonalDisorder=True, DeltaDD=0.1)
+    with pytest.raises(ValueError):
+        RingRankOneSolver.fromConfig(config)
@@ -0,0 +1,37 @@
+import json
+
+import numpy as np
+
+from exciton.runner import SimulationConfig, Simulation, ObservableRecorder, writeManifest
+
+
+def unseeded():
+    return SimulationConfig(Nmol=21, Ntimes=200, Nskip=20, useStaticDiagonalDisorder=True, DeltaDD=0.2)
+
+
+def test_reused_unseeded_config_gives_new_realizations():
+    config = unseeded()
+    displacements, seeds = [], []
+    for _ in range(3):
+        sim = Simulation(config, [ObservableRecorder()])
+        displacements.append(sim.run()[0].Displacement_list)
+        seeds.append(sim.config.seed)
+    assert config.seed is None
+    assert None not in seeds and len(set(seeds)) == 3
+    assert not np.array_equal(displacements[0], displacements[1])
+    assert not np.array_equal(displacements[1], displacements[2])
+
+
+def test_manifest_seed_reproduces_run(tmp_path):
+    sim = Simulation(unseeded(), [ObservableRecorder()])
+    recorder = sim.run()[0]
+    filename = str(tmp_path/'manifest.json')
+    writeManifest(filename, sim.config, sim.timings)
+    with open(filename) as f:
+        manifest = json.load(f)
+    assert manifest['seed'] == sim.config.seed
+
+    config = SimulationConfig.fromDict(manifest['parameters'])
+    rerun = Simulation(config, [ObservableRecorder()]).run()[0]
+    for name in ('Pmol', 'IPR', 'Displacement_list', 'Correlation_list'):
+        assert np.array_equal(getattr(rerun, name), getattr(recorder, name)), name
@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+
+from exciton.pipeline import snapshot
+from exciton.runner import SimulationConfig, Simulation, ObservableRecorder, buildModel
+
+
+OBSERVABLES = ('times', 'Pmol', 'IPR', 'distr_list', 'Displacement_list', 'Correlation_list', 'Current_list')
+
+STATIC = {'useStaticDiagonalDisorder': True, 'DeltaDD': 0.1}
+
+BACKENDS = [
+    {'backend': 'dense'},
+    {'backend': 'dense', 'useDynamicDiagonalDisorder': True, 'DeltaDD': 0.1, 'TauDD': 0.5},
+    dict(STATIC, backend='dense', propagator='exact', correlationMethod='spectral'),
+    dict(STATIC, backend='dense', propagator='exact', correlationMethod='propagate'),
+    dict(STATIC, backend='sparse'),
+    dict(STATIC, backend='eigenbasis', propagator='eigenbasis', correlationMethod='spectral'),
+    {'backend': 'window', 'Kcav': 0, 'computeCorrelation': False, 'initialState': 'gaussian'},
+]
+
+
+def run(pipelineDepth, options):
+    options = dict({'Kcav': 2}, **options)
+    config = SimulationConfig(Nmol=41, Ntimes=400, Nskip=10, Vcav=0.05, Gamma=0.02, seed=11,
+                              pipelineDepth=pipelineDepth, **options)
+    return Simulation(config, [ObservableRecorder()]).run()[0]
+
+
+@pytest.mark.parametrize('options', BACKENDS)
+def test_pipelined_matches_synchronous(options):
+    if options['backend'] == 'sparse':
+        pytest.importorskip('scipy')
+    synchronous = run(0, options)
+    pipelined = run(4, options)
+    for name in OBSERVABLES:
+        assert np.array_equal(getattr(pipelined, name), getattr(synchronous, name)), name
+
+
+def test_eigenbasis_snapshot_is_independent():
+    config = SimulationConfig(Nmol=11, Vcav=0.05, backend='eigenbasis', propagator='eigenbasis',
+                              correlationMethod='spectral', seed=1)
+    model = buildModel(config)
+    for step in (model.propagateCj_Eigenbasis, model.propagateCj_RK4):
+        step(0.1)
+        snap = snapshot(model)
+        before = snap.Cj.copy()
+        model.propagateCj_RK4(0.1)          # updates the site-basis Cj in place
+        model.propagateCj_Eigenbasis(0.1)
+        assert np.array_equal(snap.Cj, before)
@@ -0,0 +1,35 @@
+import numpy as np
+import pytest
+
+pytest.importorskip('scipy')
+
+from exciton.runner import SimulationConfig, Simulation, ObservableRecorder
+
+
+def run(backend, **kwargs):
+    config = SimulationConfig(Nmol=21, Ntimes=500, Nskip=25, Vcav=0.05, Kcav=2, seed=7,
+                              backend=backend, **kwargs)
+    return Simulation(config, [ObservableRecorder()]).run()[0]
+
+
+@pytest.mark.parametrize('Gamma', (0.0, 0.05))
+@pytest.mark.parametrize('options', [
+    {},
+    {'useStaticDiagonalDisorder': True, 'DeltaDD': 0.1, 'useStaticNeighborDisorder': True, 'DeltaNN': 0.05},
+    {'useDynamicDiagonalDisorder': True, 'DeltaDD': 0.1, 'TauDD': 0.5,
+     'useDynamicNeighborDisorder': True, 'DeltaNN': 0.05, 'TauNN': 0.5},
+    {'correlationMethod': 'spectral', 'useStaticDiagonalDisorder': True, 'DeltaDD': 0.1},
+    {'propagator': 'exact', 'correlationMethod': 'spectral'},
+])
+def test_sparse_matches_dense(Gamma, options):
+    dense = run('dense', Gamma=Gamma, **options)
+    sparse = run('sparse', Gamma=Gamma, **options)
+    assert np.allclose(sparse.Pmol, dense.Pmol, rtol=1e-13, atol=0.0)
+    assert np.allclose(sparse.Displacement_list, dense.Displacement_list, rtol=1e-12, atol=1e-14)
+    assert np.max(np.abs(np.array(sparse.Correlation_list) - dense.Correlation_list)) < 1e-13
+
+
+@pytest.mark.parametrize('initialState', ('boltzman', 'polariton', 'eigenstate'))
+def test_sparse_rejects_dense_initial_states(initialState):
+    with pytest.raises(ValueError):
+        Simulation(SimulationConfig(Nmol=11, backend='sparse', initialState=initialState))
@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+
+from exciton.runner import SimulationConfig, Simulation, ObservableRecorder
+
+
+def run(backend, **kwargs):
+    config = SimulationConfig(dt=0.01, Ntimes=1500, Nskip=50, Vcav=0.05, computeCorrelation=False,
+                              seed=1, backend=backend, **kwargs)
+    sim = Simulation(config, [ObservableRecorder(keepDistribution=False)])
+    recorder = sim.run()[0]
+    return recorder, sim.model
+
+
+@pytest.mark.parametrize('Gamma', (0.0, 0.05))
+@pytest.mark.parametrize('Nmol,initialState,initialStateArgs', [
+    (401, 'middle', {}),
+    (401, 'gaussian', {'width': 3.0, 'k0': 0.5}),
+    (401, 'bright', {}),
+    (401, 'cavity', {}),
+    (41, 'middle', {}),                         # the window grows over the whole ring
+])
+def test_window_matches_dense(Gamma, Nmol, initialState, initialStateArgs):
+    kwargs = dict(Nmol=Nmol, Gamma=Gamma, initialState=initialState, initialStateArgs=initialStateArgs)
+    dense, denseModel = run('dense', **kwargs)
+    window, windowModel = run('window', **kwargs)
+    assert window.times == dense.times
+    # the window drops deviations below tol=1e-12 in |c_j - a|^2 at its edges
+    assert np.allclose(window.Pmol, dense.Pmol, rtol=1e-12, atol=0.0)
+    assert np.allclose(window.IPR, dense.IPR, rtol=1e-10, atol=0.0)
+    assert np.allclose(window.Displacement_list, dense.Displacement_list, rtol=1e-9, atol=1e-10)
+    assert np.max(np.abs(windowModel.Cj - denseModel.Cj)) < 1e-10
+    if Nmol == 401 and initialState in ('middle', 'gaussian'):
+        assert windowModel.L < Nmol
+
+
+@pytest.mark.parametrize('kwargs', [
+    {'computeCorrelation': True},
+    {'Kcav': 2},
+    {'useStaticDiagonalDisorder': True, 'DeltaDD': 0.1},
+    {'initialState': 'random'},
+    {'initialState': 'eigenstate'},
+])
+def test_window_rejects_unsupported(kwargs):
+    options = dict(Nmol=41, backend='window', computeCorrelation=False)
+    options.update(kwargs)
+    with pytest.raises(ValueError):
+        Simulation(SimulationConfig(**options))